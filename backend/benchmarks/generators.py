@@ -0,0 +1,98 @@
+# generators.py
+"""Deterministic synthetic inputs for the benchmarks: texts, interaction logs and PDFs."""
+import json
+import random
+from datetime import datetime, timedelta
+
+METRICS = ["Bleu_1", "Bleu_2", "Bleu_3", "Bleu_4", "ROUGE_L"]
+
+
+def make_vocab(size=5000, seed=0):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(size)]
+
+
+def random_tokens(n_tokens, rng, vocab):
+    # Zipf-like word frequencies, as in natural text: a few words repeat a lot
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    return rng.choices(vocab, weights=weights, k=n_tokens)
+
+
+def answer_reference_pair(n_tokens, seed=0, overlap=0.6, vocab=None):
+    """A reference and an answer of n_tokens each; the answer copies about `overlap`
+    of the reference's tokens in order and fills the rest with random words."""
+    rng = random.Random(seed)
+    vocab = vocab or make_vocab()
+    reference = random_tokens(n_tokens, rng, vocab)
+    filler = random_tokens(n_tokens, rng, vocab)
+    answer = [ref if rng.random() < overlap else fill for ref, fill in zip(reference, filler)]
+    return " ".join(answer), " ".join(reference)
+
+
+def questions(n, seed=0):
+    rng = random.Random(seed)
+    topics = ["ai applications", "difference between supervised and unsupervised learning",
+              "machine learning vs deep learning", "ml and dl", "neural networks", "overfitting"]
+    return [f"{rng.choice(topics)} #{i}" for i in range(n)]
+
+
+def log_entries(n_entries, n_questions=1000, seed=0, start=datetime(2025, 1, 1)):
+    """Yields qa_log.jsonl entries: n_questions distinct questions asked repeatedly,
+    one entry per second, with random metrics."""
+    rng = random.Random(seed)
+    pool = questions(n_questions, seed)
+    for i in range(n_entries):
+        yield {
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "message_id": i + 1,
+            "question": pool[rng.randrange(n_questions)],
+            "answer": "synthetic answer",
+            "model": "stub",
+            "metrics": {m: rng.random() for m in METRICS},
+        }
+
+
+def write_log(path, n_entries, n_questions=1000, seed=0):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in log_entries(n_entries, n_questions, seed):
+            f.write(json.dumps(entry) + "\n")
+    return path
+
+
+def _pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, n_pages, words_per_page=300, seed=0):
+    """Writes a minimal text PDF (Helvetica, one text object per line) that PyPDF2 can extract."""
+    rng = random.Random(seed)
+    vocab = make_vocab(seed=seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for _ in range(n_pages):
+        words = random_tokens(words_per_page, rng, vocab)
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_string(line)}) '" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, n_pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
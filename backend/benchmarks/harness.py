@@ -0,0 +1,118 @@
+# harness.py
+"""Timing, memory and JSON reporting shared by the benchmarks."""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from utils.streaming import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(name, fn, items=1, repeat=5, min_seconds=0.2, max_calls=1000, memory=True, warmup=True,
+            **params):
+    """
+    Times fn() at least `repeat` times (and for at least min_seconds, up to max_calls
+    calls), then runs it once more under tracemalloc for the peak Python allocation.
+    :param items: units of work per call (tokens, entries, pages), for throughput
+    :param params: recorded with the result to identify the case (sizes, variant)
+    """
+    if warmup:
+        fn()  # imports, caches, first-call setup
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < max_calls and (len(latencies) < repeat or time.perf_counter() - start < min_seconds):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    return {
+        "name": name,
+        "params": params,
+        "calls": len(latencies),
+        "items": items,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 4),
+        "p50_ms": round(p50 * 1000, 4),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "max_ms": round(latencies[-1] * 1000, 4),
+        "items_per_second": round(items / p50, 2) if p50 else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def case_key(result):
+    return result["name"] + "".join(f" {k}={v}" for k, v in sorted(result["params"].items()))
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save(path, results, **meta):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": {**environment(), **meta}, "results": results}, f, indent=2)
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline, results, max_slowdown=None):
+    """
+    Lines comparing the p50 latency of each case with the same case in a baseline
+    run (as saved by save()), and the keys of cases slower than max_slowdown times
+    the baseline.
+    """
+    before = {case_key(r): r for r in baseline["results"]}
+    lines, regressed = [], []
+    for result in results:
+        key = case_key(result)
+        old = before.get(key)
+        if old is None or not old["p50_ms"]:
+            lines.append(f"{key:<60} new")
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"]
+        flag = ""
+        if max_slowdown is not None and ratio > max_slowdown:
+            regressed.append(key)
+            flag = "  SLOWER"
+        lines.append(f"{key:<60} {old['p50_ms']:>10.3f} -> {result['p50_ms']:>10.3f} ms  x{ratio:.2f}{flag}")
+    return lines, regressed
+
+
+def format_result(result):
+    memory = result["peak_memory_bytes"]
+    memory = f"{memory / 1024:10.1f} KiB" if memory is not None else " " * 14
+    rate = result["items_per_second"]
+    return (f"{case_key(result):<60} p50 {result['p50_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms  "
+            f"p99 {result['p99_ms']:>10.3f} ms  {rate if rate is not None else '-':>12}/s  {memory}")
@@ -0,0 +1,234 @@
+# hot_paths.py
+"""Benchmarks for the scoring, log analysis and PDF ingestion hot paths.
+
+Usage (from backend/):
+    python -m benchmarks.hot_paths --profile quick --json before.json
+    python -m benchmarks.hot_paths --profile quick --compare before.json --max-slowdown 1.25
+
+Groups (--only):
+    scoring   my_lcs vs the bit-parallel lcs_length, precook, cook_refs (dict and packed),
+              BleuScorer.compute_score and Rouge.calc_score, for answer/reference
+              lengths of --tokens tokens
+    logs      load_logs + detect_regressions, streaming top-10, RegressionDetector.update
+              from scratch, the log_store import and top/below queries, and the same
+              queries on the metric columns, for logs of --log-entries entries
+    chunking  get_text_chunks and StreamingChunker over --pages pages of text
+    pdf       page extraction and build_index on synthetic PDFs of --pages pages
+
+Everything runs offline: inputs are generated (benchmarks.generators), embeddings
+come from the local HashEmbeddings and nothing calls an LLM. Each case reports
+p50/p95/p99 latency, throughput in items (tokens, entries or pages) per second and
+the peak Python allocation. Generated logs and PDFs are kept in --workdir, so
+reruns with the same sizes skip generating them.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from benchmarks import generators, harness
+
+PROFILES = {
+    "quick": {"tokens": [10, 100, 1000], "log_entries": [1000, 10000], "pages": [1, 10], "repeat": 5},
+    "full": {"tokens": [10, 100, 1000, 10000], "log_entries": [1000, 100000, 1000000], "pages": [1, 10, 100],
+             "repeat": 10},
+}
+GROUPS = ["scoring", "logs", "chunking", "pdf"]
+# the quadratic pure-Python my_lcs takes minutes beyond this; lcs_length still runs
+MY_LCS_MAX_TOKENS = 2000
+
+
+def scoring_cases(tokens, repeat, memory):
+    from bleu.bleu_scorer import BleuScorer, cook_refs, precook
+    from rouge.lcs import TokenVocab, lcs_length
+    from rouge.rouge import Rouge, my_lcs
+
+    vocab = generators.make_vocab()
+    rouge = Rouge()
+    for n in tokens:
+        answer, reference = generators.answer_reference_pair(n, seed=n, vocab=vocab)
+        answer_tokens, reference_tokens = answer.split(" "), reference.split(" ")
+        token_vocab = TokenVocab()
+        answer_ids, reference_ids = token_vocab.encode(answer_tokens), token_vocab.encode(reference_tokens)
+        run = lambda name, fn, **params: harness.measure(name, fn, items=n, repeat=repeat, memory=memory,
+                                                          tokens=n, **params)
+
+        if n <= MY_LCS_MAX_TOKENS:
+            yield run("my_lcs", lambda: my_lcs(answer_tokens, reference_tokens))
+        yield run("lcs_length", lambda: lcs_length(answer_ids, reference_ids))
+        yield run("precook", lambda: precook(reference))
+        yield run("cook_refs", lambda: cook_refs([reference]), packed=False)
+        yield run("cook_refs", lambda: cook_refs([reference], packed=True), packed=True)
+        for packed in (False, True):
+            yield run("bleu_compute_score", lambda: BleuScorer(answer, [reference], packed=packed).compute_score(),
+                      packed=packed)
+        yield run("rouge_calc_score", lambda: rouge.calc_score([answer], [reference]))
+
+
+def log_cases(sizes, workdir, repeat, memory):
+    from utils import logger
+    from utils.log_store import LogStore
+    from utils.log_writer import LogWriter
+    from utils.metric_columns import MetricColumns
+    from utils.regressions import RegressionDetector
+
+    for n in sizes:
+        path = os.path.join(workdir, f"qa_log_{n}.jsonl")
+        if not os.path.exists(path):
+            generators.write_log(path + ".tmp", n)
+            os.replace(path + ".tmp", path)
+        # large logs take seconds per pass: no warm-up, no minimum run time
+        run = lambda name, fn: harness.measure(name, fn, items=n, repeat=repeat if n <= 100000 else 1,
+                                               min_seconds=0 if n > 100000 else 0.2, memory=memory,
+                                               warmup=n <= 100000, entries=n)
+
+        logger.LOG_FILE, log_file = path, logger.LOG_FILE
+        try:
+            yield run("load_logs+detect_regressions", lambda: logger.detect_regressions(logger.load_logs()))
+            yield run("iter_logs+top10", lambda: logger.rank_by_metric(logger.iter_logs(), limit=10))
+        finally:
+            logger.LOG_FILE = log_file
+
+        state_path = os.path.join(workdir, "regression_state.json")
+
+        def detect_from_scratch():
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            RegressionDetector(path, state_path).update()
+        yield run("regression_detector_update", detect_from_scratch)
+
+        db_path = os.path.join(workdir, f"qa_log_{n}.db")
+
+        def import_log():
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            store = LogStore(db_path)
+            store.import_jsonl(path)
+            store.close()
+        yield run("log_store_import", import_log)
+
+        store = LogStore(db_path)
+        yield harness.measure("log_store_top", lambda: store.top("ROUGE_L", limit=50), items=50, repeat=repeat,
+                              memory=memory, entries=n)
+        yield harness.measure("log_store_below", lambda: store.below("ROUGE_L", 0.5, limit=50), items=50,
+                              repeat=repeat, memory=memory, entries=n)
+        store.close()
+
+        columns = MetricColumns(os.path.join(workdir, f"columns_{n}"), store=None)
+        columns.reset()
+        LogWriter(path, store=None, columns=columns).sync_columns()
+        yield harness.measure("metric_columns_top", lambda: columns.top("ROUGE_L", limit=50), items=50,
+                              repeat=repeat, memory=memory, entries=n)
+        yield harness.measure("metric_columns_below", lambda: columns.below("ROUGE_L", 0.5, limit=50), items=50,
+                              repeat=repeat, memory=memory, entries=n)
+
+
+def page_texts(n_pages, words_per_page=300):
+    rng = random.Random(n_pages)
+    vocab = generators.make_vocab()
+    return [" ".join(generators.random_tokens(words_per_page, rng, vocab)) for _ in range(n_pages)]
+
+
+def chunking_cases(pages, repeat, memory):
+    from utils.pdf_pipeline import StreamingChunker, get_text_chunks
+
+    for n in pages:
+        texts = page_texts(n)
+        text = "\n".join(texts)
+
+        def stream():
+            chunker = StreamingChunker()
+            chunks = [c for t in texts for c in chunker.feed(t)]
+            return chunks + chunker.flush()
+        yield harness.measure("get_text_chunks", lambda: get_text_chunks(text), items=n, repeat=repeat,
+                              memory=memory, pages=n)
+        yield harness.measure("streaming_chunker", stream, items=n, repeat=repeat, memory=memory, pages=n)
+
+
+def pdf_cases(pages, workdir, repeat, memory):
+    from utils.embedding_cache import HashEmbeddings
+    from utils.pdf_pipeline import build_index, iter_page_texts, shutdown_executor
+
+    async def extract(path):
+        return [text async for text in iter_page_texts(path)]
+
+    embeddings = HashEmbeddings()
+    try:
+        for n in pages:
+            path = generators.write_pdf(os.path.join(workdir, f"doc_{n}.pdf"), n, seed=n)
+            index_path = os.path.join(workdir, f"index_{n}")
+            # the process pool's work is not visible to tracemalloc, so no memory figure here
+            yield harness.measure("pdf_extract", lambda: asyncio.run(extract(path)), items=n, repeat=repeat,
+                                  memory=False, pages=n)
+            yield harness.measure("build_index", lambda: asyncio.run(build_index(path, index_path, embeddings)),
+                                  items=n, repeat=repeat, memory=memory, pages=n)
+    finally:
+        shutdown_executor()
+
+
+def sizes(value):
+    return [int(v) for v in value.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scoring, log analysis and PDF ingestion hot paths.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", help=f"comma-separated groups out of {', '.join(GROUPS)} (default all)")
+    parser.add_argument("--tokens", type=sizes, help="answer/reference lengths, e.g. 10,100,1000")
+    parser.add_argument("--log-entries", type=sizes, help="log sizes, e.g. 1000,1000000")
+    parser.add_argument("--pages", type=sizes, help="PDF page counts, e.g. 1,10,100")
+    parser.add_argument("--repeat", type=int, help="minimum timed calls per case")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of each case")
+    parser.add_argument("--workdir", help="where generated logs and PDFs are kept (default: a temporary directory)")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare p50 latencies with")
+    parser.add_argument("--max-slowdown", type=float,
+                        help="with --compare, exit with status 1 if a case is slower than this factor")
+    args = parser.parse_args(argv)
+
+    groups = args.only.split(",") if args.only else GROUPS
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(sorted(unknown))}")
+    profile = PROFILES[args.profile]
+    repeat = args.repeat or profile["repeat"]
+    memory = not args.no_memory
+    workdir = args.workdir or tempfile.mkdtemp(prefix="llm-eval-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    cases = {
+        "scoring": lambda: scoring_cases(args.tokens or profile["tokens"], repeat, memory),
+        "logs": lambda: log_cases(args.log_entries or profile["log_entries"], workdir, repeat, memory),
+        "chunking": lambda: chunking_cases(args.pages or profile["pages"], repeat, memory),
+        "pdf": lambda: pdf_cases(args.pages or profile["pages"], workdir, repeat, memory),
+    }
+    results = []
+    try:
+        for group in groups:
+            for result in cases[group]():
+                result["group"] = group
+                results.append(result)
+                print(harness.format_result(result), flush=True)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        harness.save(args.json, results, profile=args.profile, groups=groups)
+
+    if args.compare:
+        lines, regressed = harness.compare(harness.load(args.compare), results, args.max_slowdown)
+        print(f"\ncompared with {args.compare}:")
+        print("\n".join(lines))
+        if regressed:
+            print(f"{len(regressed)} case(s) slower than x{args.max_slowdown}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
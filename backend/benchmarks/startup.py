@@ -0,0 +1,110 @@
+# startup.py
+"""Startup-time benchmark for the server and the scoring-only import path.
+
+Usage (from backend/):
+    python -m benchmarks.startup --repeat 5 --json startup.json
+
+Each target is imported in a fresh interpreter, --repeat times. The median import
+time and process wall time are reported with any heavy module the import pulled
+in. The run exits with status 1 when a target is over its time budget or imports
+a module it must leave for first use, so it can guard against startup regressions.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules each target imports
+TARGETS = {
+    "scoring": ["bleu.bleu", "rouge.rouge", "utils.scorer"],
+    "batch_scorer": ["utils.batch_scorer"],
+    "server": ["server"],
+}
+# heavy dependencies that must only be imported on first use
+LAZY_MODULES = ["langchain", "langchain_core", "langchain_community", "langchain_google_genai",
+                "google.generativeai", "faiss", "PyPDF2", "psycopg2", "httpx"]
+FORBIDDEN = {
+    "scoring": LAZY_MODULES + ["fastapi", "sqlite3"],
+    "batch_scorer": LAZY_MODULES + ["fastapi"],
+    "server": LAZY_MODULES,
+}
+BUDGET_SECONDS = {"scoring": 0.5, "batch_scorer": 0.5, "server": 1.5}
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"import_seconds": elapsed, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(target, repeat=5):
+    modules, forbidden = TARGETS[target], FORBIDDEN[target]
+    code = _CHILD.format(modules=modules, forbidden=forbidden)
+    import_times, process_times, loaded = [], [], set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+        process_times.append(time.perf_counter() - start)
+        if out.returncode != 0:
+            raise RuntimeError(f"importing {target} failed:\n{out.stderr}")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        import_times.append(result["import_seconds"])
+        loaded.update(result["loaded"])
+    return {
+        "target": target,
+        "modules": modules,
+        "repeat": repeat,
+        "import_seconds_median": round(statistics.median(import_times), 4),
+        "import_seconds_min": round(min(import_times), 4),
+        "process_seconds_median": round(statistics.median(process_times), 4),
+        "budget_seconds": BUDGET_SECONDS[target],
+        "eagerly_loaded": sorted(loaded),
+    }
+
+
+def check(result):
+    problems = []
+    if result["import_seconds_median"] > result["budget_seconds"]:
+        problems.append(f"import took {result['import_seconds_median']}s (budget {result['budget_seconds']}s)")
+    if result["eagerly_loaded"]:
+        problems.append(f"imports {', '.join(result['eagerly_loaded'])} at load time")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time of the server and the scoring modules.")
+    parser.add_argument("targets", nargs="*", help=f"any of {', '.join(TARGETS)} (default all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--no-check", action="store_true", help="report only, never fail")
+    args = parser.parse_args(argv)
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(sorted(unknown))}")
+
+    results, failed = [], False
+    for target in args.targets or list(TARGETS):
+        result = measure(target, args.repeat)
+        result["problems"] = check(result)
+        failed |= bool(result["problems"])
+        results.append(result)
+        status = "FAIL " + "; ".join(result["problems"]) if result["problems"] else "ok"
+        print(f"{target:<14} import {result['import_seconds_median'] * 1000:8.1f} ms   "
+              f"process {result['process_seconds_median'] * 1000:8.1f} ms   {status}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed and not args.no_check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
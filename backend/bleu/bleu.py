@@ -1,25 +1,37 @@
 from .bleu_scorer import BleuScorer
 
 class Bleu:
-    def __init__(self, n=4):
+    def __init__(self, n=4, packed=False):
         # default compute Blue score up to 4
         self._n = n
+        # packed: count n-grams with integer keys (bleu_scorer.PackedNgramCounts)
+        self._packed = packed
         self._hypo_for_image = {}
         self.ref_for_image = {}
 
-    def compute_score(self, gts, res, verbose=1):
+    def compute_score(self, gts, res, verbose=1, cooked_refs=None):
+        # cooked_refs: optional dict of id -> cook_refs() output, used instead of gts
+        # so that references cooked once (see utils.reference_store) are not re-cooked
 
-        assert(gts.keys() == res.keys())
-        imgIds = gts.keys()
+        if cooked_refs is not None:
+            assert(cooked_refs.keys() == res.keys())
+        else:
+            assert(gts.keys() == res.keys())
+        imgIds = res.keys()
 
-        bleu_scorer = BleuScorer(n=self._n)
+        bleu_scorer = BleuScorer(n=self._n, packed=self._packed)
         for id in imgIds:
             hypo = res[id]
-            ref = gts[id]
 
             # Sanity check.
             assert(type(hypo) is list)
             assert(len(hypo) == 1)
+
+            if cooked_refs is not None:
+                bleu_scorer.cook_append_cooked(hypo[0], cooked_refs[id])
+                continue
+
+            ref = gts[id]
             assert(type(ref) is list)
             assert(len(ref) >= 1)
 
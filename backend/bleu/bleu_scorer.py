@@ -2,6 +2,8 @@ import copy
 import sys, math, re
 from collections import defaultdict
 
+from .packed_ngrams import PackedNgramCounts
+
 def precook(s, n=4, out=False):
     """Takes a string as input and returns an object that can be given to
     either cook_refs or cook_test. This is optional: cook_refs and cook_test
@@ -14,18 +16,25 @@ def precook(s, n=4, out=False):
             counts[ngram] += 1
     return (len(words), counts)
 
-def cook_refs(refs, eff=None, n=4): ## lhuang: oracle will call with "average"
+def cook_refs(refs, eff=None, n=4, packed=False): ## lhuang: oracle will call with "average"
     '''Takes a list of reference sentences for a single segment
     and returns an object that encapsulates everything that BLEU
-    needs to know about them.'''
-
-    reflen = []
-    maxcounts = {}
-    for ref in refs:
-        rl, counts = precook(ref, n)
-        reflen.append(rl)
-        for (ngram,count) in counts.items():
-            maxcounts[ngram] = max(maxcounts.get(ngram,0), count)
+    needs to know about them.
+    With packed=True the max counts are a PackedNgramCounts (integer keys,
+    NumPy counting) instead of a dict; cook_test accepts either.'''
+
+    if packed:
+        words = [ref.split() for ref in refs]
+        reflen = [len(w) for w in words]
+        maxcounts = PackedNgramCounts(words, n)
+    else:
+        reflen = []
+        maxcounts = {}
+        for ref in refs:
+            rl, counts = precook(ref, n)
+            reflen.append(rl)
+            for (ngram,count) in counts.items():
+                maxcounts[ngram] = max(maxcounts.get(ngram,0), count)
 
     # Calculate effective reference sentence length.
     if eff == "shortest":
@@ -44,7 +53,11 @@ def cook_test(test, refs, eff=None, n=4):
     encapsulates everything that BLEU needs to know about it.'''
 
     reflen, refmaxcounts = refs
-    testlen, counts = precook(test, n, True)
+    if isinstance(refmaxcounts, PackedNgramCounts):
+        words = test.split()
+        testlen = len(words)
+    else:
+        testlen, counts = precook(test, n, True)
 
     result = {}
 
@@ -59,9 +72,12 @@ def cook_test(test, refs, eff=None, n=4):
 
     result["guess"] = [max(0,testlen-k+1) for k in range(1,n+1)]
 
-    result['correct'] = [0]*n
-    for (ngram, count) in counts.items():
-        result["correct"][len(ngram)-1] += min(refmaxcounts.get(ngram,0), count)
+    if isinstance(refmaxcounts, PackedNgramCounts):
+        result['correct'] = refmaxcounts.clipped_counts(words)
+    else:
+        result['correct'] = [0]*n
+        for (ngram, count) in counts.items():
+            result["correct"][len(ngram)-1] += min(refmaxcounts.get(ngram,0), count)
 
     return result
 
@@ -69,21 +85,22 @@ class BleuScorer(object):
     """Bleu scorer.
     """
 
-    __slots__ = "n", "crefs", "ctest", "_score", "_ratio", "_testlen", "_reflen", "special_reflen"
+    __slots__ = "n", "crefs", "ctest", "_score", "_ratio", "_testlen", "_reflen", "special_reflen", "packed"
     # special_reflen is used in oracle (proportional effective ref len for a node).
 
     def copy(self):
         ''' copy the refs.'''
-        new = BleuScorer(n=self.n)
+        new = BleuScorer(n=self.n, packed=self.packed)
         new.ctest = copy.copy(self.ctest)
         new.crefs = copy.copy(self.crefs)
         new._score = None
         return new
 
-    def __init__(self, test=None, refs=None, n=4, special_reflen=None):
+    def __init__(self, test=None, refs=None, n=4, special_reflen=None, packed=False):
         ''' singular instance '''
 
         self.n = n
+        self.packed = packed ## count n-grams with packed integer keys (see PackedNgramCounts)
         self.crefs = []
         self.ctest = []
         self.cook_append(test, refs)
@@ -93,7 +110,7 @@ class BleuScorer(object):
         '''called by constructor and __iadd__ to avoid creating new instances.'''
 
         if refs is not None:
-            self.crefs.append(cook_refs(refs))
+            self.crefs.append(cook_refs(refs, packed=self.packed))
             if test is not None:
                 cooked_test = cook_test(test, self.crefs[-1])
                 self.ctest.append(cooked_test) ## N.B.: -1
@@ -102,6 +119,17 @@ class BleuScorer(object):
 
         self._score = None ## need to recompute
 
+    def cook_append_cooked(self, test, crefs):
+        '''like cook_append, but with references already cooked by cook_refs (e.g. cached across calls).'''
+
+        self.crefs.append(crefs)
+        if test is not None:
+            self.ctest.append(cook_test(test, crefs))
+        else:
+            self.ctest.append(None)
+
+        self._score = None ## need to recompute
+
     def ratio(self, option=None):
         self.compute_score(option=option)
         return self._ratio
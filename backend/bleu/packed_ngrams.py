@@ -0,0 +1,69 @@
+import numpy as np
+
+_INT64_MAX = 2**63 - 1
+
+def _window_keys(ids, k, radix):
+    '''packs every k-gram of ids into one integer: ids[i]*radix**(k-1) + ... + ids[i+k-1]'''
+    size = len(ids) - k + 1
+    if size <= 0:
+        return ids[:0]
+    keys = ids[:size].copy()
+    for j in range(1, k):
+        keys = keys * radix + ids[j:j + size]
+    return keys
+
+class PackedNgramCounts(object):
+    '''Max n-gram counts of the references of one segment, kept as sorted arrays of
+    packed integer keys (one array per n-gram order) instead of a dict keyed by
+    tuples of strings. Tokens are interned to ids local to these references, so a
+    test n-gram containing a token the references never use cannot match and is
+    dropped before lookup. Gives exactly the same clipped counts as the dict path.'''
+
+    __slots__ = "n", "vocab", "radix", "dtype", "keys", "counts"
+
+    def __init__(self, refs_words, n=4):
+        self.n = n
+        self.vocab = {}
+        for words in refs_words:
+            for w in words:
+                self.vocab.setdefault(w, len(self.vocab))
+        self.radix = max(len(self.vocab), 1)
+        # fall back to Python ints when an n-gram key would not fit in int64
+        self.dtype = np.int64 if self.radix**n <= _INT64_MAX else object
+
+        encoded = [self._encode(words) for words in refs_words]
+        self.keys = []
+        self.counts = []
+        for k in range(1, n+1):
+            parts = [np.unique(_window_keys(ids, k, self.radix), return_counts=True) for ids in encoded]
+            all_keys = np.concatenate([p[0] for p in parts]) if parts else np.array([], dtype=self.dtype)
+            all_counts = np.concatenate([p[1] for p in parts]) if parts else np.array([], dtype=np.int64)
+            keys, inverse = np.unique(all_keys, return_inverse=True)
+            maxcounts = np.zeros(len(keys), dtype=np.int64)
+            np.maximum.at(maxcounts, inverse.reshape(-1), all_counts)
+            self.keys.append(keys)
+            self.counts.append(maxcounts)
+
+    def _encode(self, words):
+        ids = np.fromiter((self.vocab.get(w, -1) for w in words), dtype=np.int64, count=len(words))
+        return ids if self.dtype is np.int64 else ids.astype(object)
+
+    def clipped_counts(self, words):
+        '''for k = 1..n: sum over the k-grams of words of min(count in words, max count in refs)'''
+        ids = self._encode(words)
+        # oov[i] = number of unknown tokens in words[:i]
+        oov = np.concatenate(([0], np.cumsum(ids < 0)))
+        correct = []
+        for k in range(1, self.n+1):
+            ref_keys = self.keys[k-1]
+            size = len(words) - k + 1
+            if size <= 0 or len(ref_keys) == 0:
+                correct.append(0)
+                continue
+            known = oov[k:k + size] == oov[:size]
+            keys, counts = np.unique(_window_keys(ids, k, self.radix)[known], return_counts=True)
+            pos = np.searchsorted(ref_keys, keys)
+            found = pos < len(ref_keys)
+            found[found] = ref_keys[pos[found]] == keys[found]
+            correct.append(int(np.minimum(counts[found], self.counts[k-1][pos[found]]).sum()))
+        return correct
@@ -1,21 +1,141 @@
 # db.py
 import os
-import psycopg2
+import sqlite3
+import threading
+from contextlib import contextmanager
+
 from dotenv import load_dotenv
 
 load_dotenv()
-# Set up PostgreSQL connection
+# "postgres", or "sqlite" for a local stand-in (no server needed)
+DB_BACKEND = os.getenv("DB_BACKEND", "postgres")
+DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "logs/feedback.db")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 4))
+# PostgreSQL connection settings
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 
-# Connect to PostgreSQL
-conn = psycopg2.connect(
-    dbname=DB_NAME,
-    user=DB_USER,
-    password=DB_PASSWORD,
-    host=DB_HOST,
-    port=DB_PORT
-)
+
+class Database:
+    """
+    Connections from a pool (psycopg2 ThreadedConnectionPool, or SQLite connections
+    for the stand-in), opened on first use. A connection that fails with a
+    connection-level error is discarded, so the next call reconnects.
+    """
+
+    def __init__(self, backend=DB_BACKEND, sqlite_path=DB_SQLITE_PATH, pool_min=DB_POOL_MIN, pool_max=DB_POOL_MAX):
+        self.backend = backend
+        self.sqlite_path = sqlite_path
+        self.pool_min = pool_min
+        self.pool_max = max(pool_min, pool_max)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.reconnects = 0
+
+    @property
+    def placeholder(self):
+        return "?" if self.backend == "sqlite" else "%s"
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.backend == "sqlite":
+                    self._pool = _SQLitePool(self.sqlite_path, self.pool_max)
+                else:
+                    from psycopg2.pool import ThreadedConnectionPool
+                    self._pool = ThreadedConnectionPool(
+                        self.pool_min, self.pool_max,
+                        dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT,
+                    )
+            return self._pool
+
+    def _is_connection_error(self, error):
+        if self.backend == "sqlite":
+            return isinstance(error, sqlite3.OperationalError)
+        import psycopg2
+        return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError))
+
+    @contextmanager
+    def connection(self):
+        """Yields a pooled connection inside a transaction: committed on success, rolled back on error."""
+        pool = self._get_pool()
+        conn = pool.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            broken = self._is_connection_error(e)
+            if broken:
+                self.reconnects += 1
+            else:
+                conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn, close=broken)
+
+    def insert_many(self, table, columns, rows):
+        """Inserts rows with one multi-row INSERT (one executemany transaction on SQLite)."""
+        if not rows:
+            return
+        with self.connection() as conn:
+            if self.backend == "sqlite":
+                marks = ", ".join([self.placeholder] * len(columns))
+                conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})", rows)
+            else:
+                from psycopg2.extras import execute_values
+                with conn.cursor() as cur:
+                    execute_values(cur, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s", rows,
+                                   page_size=len(rows))
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+
+class _SQLitePool:
+    """Same getconn/putconn/closeall interface as psycopg2's pools, over SQLite."""
+
+    def __init__(self, path, maxconn):
+        self.path = path
+        self.maxconn = maxconn
+        self._idle = []
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS feedbacks ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, message_id INTEGER, feedback_type TEXT, comment TEXT, "
+                "created_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+            )
+        conn.close()
+
+    def getconn(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+
+    def putconn(self, conn, close=False):
+        with self._lock:
+            if not close and len(self._idle) < self.maxconn:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def closeall(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
+
+
+database = Database()
@@ -5,6 +5,9 @@ class PDFContentRequest(BaseModel):
 
 class QueryRequest(BaseModel):
     question: str
+    session_id: str | None = None
+    document_ids: list[str] | None = None  # search these documents (merged), default: latest of the session
+    no_cache: bool = False  # skip the answer cache and regenerate
 
 class FeedbackRequest(BaseModel):
     message_id: int
@@ -0,0 +1,102 @@
+import numpy as np
+
+
+class TokenVocab(object):
+    """
+    Interns tokens to integer ids so that sequences can be compared as int arrays
+    """
+
+    def __init__(self):
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def encode(self, tokens):
+        """
+        :param tokens: list of str
+        :returns: ids: np.ndarray of int64, one id per token
+        """
+        ids = self._ids
+        return np.fromiter((ids.setdefault(t, len(ids)) for t in tokens),
+                           dtype=np.int64, count=len(tokens))
+
+
+def match_masks(ids):
+    """
+    Builds the per-symbol match bit vectors used by the bit-parallel LCS.
+    Bit i of masks[x] is set when ids[i] == x.
+    :param ids: np.ndarray of int : encoded tokens of the sequence to index
+    :returns: masks: dict of int -> int
+    """
+    masks = {}
+    if len(ids) == 0:
+        return masks
+    order = np.argsort(ids, kind="stable")
+    symbols, starts = np.unique(ids[order], return_index=True)
+    bounds = np.append(starts, len(order))
+    for k, symbol in enumerate(symbols.tolist()):
+        mask = 0
+        for i in order[bounds[k]:bounds[k + 1]].tolist():
+            mask |= 1 << i
+        masks[symbol] = mask
+    return masks
+
+
+def lcs_from_masks(masks, length, ids):
+    """
+    Bit-parallel LCS length (Allison-Dix / Hyyrö): one row of the DP table is kept
+    as the bits of a single integer, so each token of ids costs a few word-parallel
+    operations instead of a Python loop over the other sequence.
+    :param masks: dict : match_masks() of the indexed sequence
+    :param length: int : length of the indexed sequence
+    :param ids: iterable of int : encoded tokens of the other sequence
+    :returns: length of the longest common subsequence
+    """
+    full = (1 << length) - 1
+    row = full
+    for symbol in ids:
+        match = masks.get(symbol)
+        if match is None:
+            continue
+        u = row & match
+        row = ((row + u) | (row - u)) & full
+    return length - row.bit_count()
+
+
+def lcs_length(a, b):
+    """
+    Same result as rouge.my_lcs for two already encoded sequences
+    :param a: np.ndarray of int
+    :param b: np.ndarray of int
+    :returns: length of the longest common subsequence
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if len(b) == 0:
+        return 0
+    return lcs_from_masks(match_masks(a), len(a), b.tolist())
+
+
+def batch_lcs(pairs):
+    """
+    Computes LCS lengths for many (candidate tokens, list of reference tokens) pairs.
+    Tokens are encoded once with a shared vocabulary and the match masks of every
+    distinct reference are built once, so scoring many answers against the same
+    (long) reference only pays for the reference indexing a single time.
+    :param pairs: list of (list of str, list of list of str)
+    :returns: list of list of int : lcs lengths per pair, one per reference
+    """
+    vocab = TokenVocab()
+    indexed = {}
+    results = []
+    for candidate, refs in pairs:
+        cand_ids = vocab.encode(candidate).tolist()
+        lengths = []
+        for ref in refs:
+            key = tuple(ref)
+            if key not in indexed:
+                indexed[key] = match_masks(vocab.encode(ref))
+            lengths.append(lcs_from_masks(indexed[key], len(ref), cand_ids))
+        results.append(lengths)
+    return results
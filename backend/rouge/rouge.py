@@ -1,6 +1,8 @@
 import numpy as np
 import pdb
 
+from .lcs import batch_lcs
+
 def my_lcs(string, sub):
     """
     Calculates longest common subsequence for a pair of tokenized strings
@@ -40,30 +42,38 @@ class Rouge():
         :param refs: list of str : COCO reference sentences for the particular image to be evaluated
         :returns score: int (ROUGE-L score for the candidate evaluated against references)
         """
-        assert(len(candidate)==1)	
-        assert(len(refs)>0)         
-        prec = []
-        rec = []
-
-        # split into tokens
-        token_c = candidate[0].split(" ")
-    	
-        for reference in refs:
+        return self.calc_scores([(candidate, refs)])[0]
+
+    def calc_scores(self, pairs):
+        """
+        Compute ROUGE-L scores for many (candidate, refs) pairs in one call
+        :param pairs: list of (candidate, refs) : arguments as taken by calc_score
+        :returns scores: list of float (ROUGE-L score per pair, same values as calc_score)
+        """
+        tokenized = []
+        for candidate, refs in pairs:
+            assert(len(candidate)==1)
+            assert(len(refs)>0)
             # split into tokens
-            token_r = reference.split(" ")
-            # compute the longest common subsequence
-            lcs = my_lcs(token_r, token_c)
-            prec.append(lcs/float(len(token_c)))
-            rec.append(lcs/float(len(token_r)))
+            tokenized.append((candidate[0].split(" "), [reference.split(" ") for reference in refs]))
+
+        # compute the longest common subsequences with the bit-parallel backend
+        lcs_lengths = batch_lcs(tokenized)
 
-        prec_max = max(prec)
-        rec_max = max(rec)
+        scores = []
+        for (token_c, token_rs), lcs_list in zip(tokenized, lcs_lengths):
+            prec = [lcs/float(len(token_c)) for lcs in lcs_list]
+            rec = [lcs/float(len(token_r)) for lcs, token_r in zip(lcs_list, token_rs)]
 
-        if(prec_max!=0 and rec_max !=0):
-            score = ((1 + self.beta**2)*prec_max*rec_max)/float(rec_max + self.beta**2*prec_max)
-        else:
-            score = 0.0
-        return score
+            prec_max = max(prec)
+            rec_max = max(rec)
+
+            if(prec_max!=0 and rec_max !=0):
+                score = ((1 + self.beta**2)*prec_max*rec_max)/float(rec_max + self.beta**2*prec_max)
+            else:
+                score = 0.0
+            scores.append(score)
+        return scores
 
     def compute_score(self, gts, res):
         """
@@ -76,19 +86,20 @@ class Rouge():
         assert(gts.keys() == res.keys())
         imgIds = gts.keys()
 
-        score = []
+        pairs = []
         for id in imgIds:
             hypo = res[id]
             ref  = gts[id]
 
-            score.append(self.calc_score(hypo, ref))
-
             # Sanity check.
             assert(type(hypo) is list)
             assert(len(hypo) == 1)
             assert(type(ref) is list)
             assert(len(ref) > 0)
 
+            pairs.append((hypo, ref))
+
+        score = self.calc_scores(pairs)
         average_score = np.mean(np.array(score))
         return average_score, np.array(score)
 
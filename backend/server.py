@@ -1,30 +1,61 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
+import asyncio
+import functools
+import hashlib
 import shutil
-import uuid
-import PyPDF2
 import tempfile
-import google.generativeai as genai
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.chains.question_answering import load_qa_chain
-from langchain_core.prompts import PromptTemplate
-
-from db import conn
+import time
+
+from db import database
 from models import QueryRequest, PDFContentRequest, FeedbackRequest, RetryRequest
-from utils.scorer import load_textfiles, score
-from utils.logger import log_interaction, load_logs, rank_by_metric, surface_low_scores, detect_regressions
-from utils.ollama_client import call_ollama_model
+from utils.scoring_pool import scoring_pool, ScoringQueueFull
+from utils.references import ASK_REFERENCES, RETRY_REFERENCES, match_reference
+from utils.logger import log_interaction, new_message_id
+from utils.log_writer import log_writer
+from utils.log_store import log_store, METRICS
+from utils.metric_columns import metric_columns
+from utils.timeseries import GRANULARITIES, SERIES_DIMENSIONS
+from utils.regressions import regression_detector
+from utils.ollama_client import ollama_client
+from utils.index_manager import index_manager
+from utils.index_registry import index_registry
+from utils.pdf_pipeline import build_index, shutdown_executor as shutdown_pdf_workers
+from utils.jobs import ingestion_queue
+from utils.streaming import sse_event, StreamTimer, stream_stats
+from utils.answer_cache import answer_cache
+from utils.feedback_writer import feedback_writer, FeedbackBufferFull
+from utils.metrics import registry, timed, record, request_timings, timing_ms, MetricsMiddleware, METRICS_DEV_TIMING
 
 # Load environment variables
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ingestion_queue.start()
+    feedback_writer.start()
+    log_writer.start()
+    try:
+        # builds the metric columns from the log on the first start, catches up if they fell behind
+        await asyncio.to_thread(log_writer.sync_columns)
+    except Exception as e:
+        print("Metric columns not synced:", e)
+    yield
+    await ingestion_queue.stop()
+    scoring_pool.shutdown()
+    shutdown_pdf_workers()
+    await ollama_client.aclose()
+    feedback_writer.close()
+    database.close()
+    log_writer.close()
+    log_store.close()
 
 # FastAPI setup
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend access
 app.add_middleware(
@@ -34,36 +65,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# request counts and latency per route, for /metrics
+app.add_middleware(MetricsMiddleware)
 
-# Utility functions
-def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
-    try:
-        with open(file_path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text += page.extract_text() or ""
-        return text
-    except Exception as e:
-        raise RuntimeError(f"Error reading PDF: {e}")
-    
-def get_text_chunks(text: str):
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=10000, chunk_overlap=1000
-    )
-    chunks = text_splitter.split_text(text)
-    return chunks
+registry.gauge("llm_eval_scoring_pending", "Scoring tasks queued or running.", lambda: scoring_pool.pending)
+registry.gauge("llm_eval_ollama_in_flight", "Ollama generations in flight.", lambda: ollama_client.in_flight)
+registry.gauge("llm_eval_feedback_buffered", "Feedback rows waiting to be written.", lambda: feedback_writer.stats()["buffered"])
+registry.gauge("llm_eval_log_buffered", "Interaction log lines waiting to be written.", lambda: log_writer.pending)
+registry.gauge("llm_eval_answer_cache_entries", "Answers in the answer cache.", lambda: answer_cache.stats()["entries"])
 
-
-def get_vector_store(text_chunks, index_name):
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vector_store = FAISS.from_texts(text_chunks, embedding=embeddings)
-    vector_store.save_local(index_name)
-    return index_name
-
-
-def get_conversational_chain():
-    prompt_template = """
+# Utility functions
+CHAT_MODEL = "gemini-1.5-flash"
+QA_PROMPT_TEMPLATE = """
     Answer the question as detailed as possible from the provided context. If the answer is not in
     the provided context, just say "answer is not available in the context" and do not guess.
 
@@ -75,175 +88,447 @@ def get_conversational_chain():
 
     Answer:
     """
-
-    model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0.3)
-    prompt = PromptTemplate(
-        template=prompt_template, input_variables=["context", "question"]
+# cached answers are only reused for the same prompt
+QA_PROMPT_VERSION = hashlib.sha256(QA_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+# Gemini and LangChain take seconds to import, so they are loaded on first use
+@functools.cache
+def configure_genai():
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+def get_chat_model():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    configure_genai()
+    return ChatGoogleGenerativeAI(model=CHAT_MODEL, temperature=0.3)
+
+def get_qa_prompt():
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate(
+        template=QA_PROMPT_TEMPLATE, input_variables=["context", "question"]
     )
-    chain = load_qa_chain(model, chain_type="stuff", prompt=prompt)
-    return chain
 
+def get_conversational_chain():
+    from langchain.chains.question_answering import load_qa_chain
+    chain = load_qa_chain(get_chat_model(), chain_type="stuff", prompt=get_qa_prompt())
+    return chain
 
-current_index_name = None
+async def stream_chat_answer(docs, question):
+    # same prompt the "stuff" chain builds: chunk texts joined by blank lines
+    prompt = get_qa_prompt().format(
+        context="\n\n".join(doc.page_content for doc in docs), question=question
+    )
+    start = time.perf_counter()
+    try:
+        async for chunk in get_chat_model().astream(prompt):
+            if chunk.content:
+                yield chunk.content
+    finally:
+        record("gemini_stream", time.perf_counter() - start)
+
+def retry_prompt(data):
+    return (
+        f"I have a question: {data.question}\n\n"
+        f"And an answer from a language model: {data.response}\n\n"
+        f"Please improve this answer to be more clear, accurate."
+    )
 
-@app.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    global current_index_name
+def resolve_documents(request):
+    try:
+        documents = index_registry.resolve(request.session_id, request.document_ids)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    if not documents and request.session_id:
+        documents = [d for d in index_registry.session_documents(request.session_id) if d.get("status") == "pending"]
+    if any(d.get("status") == "pending" for d in documents):
+        raise HTTPException(status_code=409, detail="Document is still being indexed.")
+    if not documents:
+        raise HTTPException(status_code=400, detail="No PDF content indexed. Upload PDF content first.")
+    for document in documents:
+        index_registry.touch(document["document_id"])
+    return documents
 
+def lookup_answer(request, documents):
+    """
+    Returns (cache key, cached response or None, question embedding to cache with, question
+    vector for the similarity search or None). Blocking (the near-duplicate lookup embeds
+    the question): run it in a thread.
+    """
+    index_key = ",".join(sorted(d["document_id"] for d in documents))
+    cache_key = answer_cache.make_key(index_key, request.question, QA_PROMPT_VERSION, CHAT_MODEL)
+    if request.no_cache:
+        answer_cache.bypass()
+        return cache_key, None, None, None
+    vectors = []
+
+    def embed(_):
+        # the question as the search embeds it, so a miss does not embed it twice
+        vectors.append(index_manager.embeddings().embed_query(request.question))
+        return vectors[0]
+    with timed("cache_lookup"):
+        cached, embedding = answer_cache.get(cache_key, embed=embed)
+    return cache_key, cached, embedding, vectors[0] if vectors else None
+
+def with_timing(response):
+    # developer mode: per-stage breakdown of this request, in ms
+    return {**response, "timing": timing_ms(request_timings())} if METRICS_DEV_TIMING else response
+
+async def stream_answer(endpoint, pieces, question, references, answer_key, model, on_done=None):
+    """
+    Server-sent events: one "token" event per generated piece, then a "metrics" event
+    with the full answer, its message_id, its scores (when a reference matches) and
+    ttft_ms / total_ms, or an "error" event if generation fails.
+    on_done(answer, metrics, message_id) is called once the answer is complete and scored.
+    """
+    timer = StreamTimer()
+    parts = []
+    try:
+        async for piece in pieces:
+            timer.token()
+            parts.append(piece)
+            yield sse_event("token", {"text": piece})
+    except Exception as e:
+        print(f"Error in {endpoint}:", e)
+        stream_stats.record_error(endpoint)
+        yield sse_event("error", {"detail": str(e)})
+        return
+    final = timer.finish()
+    stream_stats.record(endpoint, timer)
+
+    answer_text = "".join(parts).strip()
+    final[answer_key] = answer_text
+    final["message_id"] = new_message_id()
+    try:
+        with timed("reference_match"):
+            matched_ref_file = match_reference(question, references)
+        if matched_ref_file:
+            try:
+                scores, timing = await scoring_pool.score_reference(matched_ref_file, answer_text)
+            except ScoringQueueFull as e:
+                final["error"] = str(e)
+            else:
+                print("Scores:", scores, "Scoring time:", timing)
+                final["message_id"] = log_interaction(question, answer_text, scores, model=model,
+                                                          reference=matched_ref_file)
+                final["metrics"] = scores
+        if on_done and "error" not in final:
+            on_done(answer_text, final.get("metrics"), final["message_id"])
+    except Exception as e:
+        # the tokens are out already: end the stream with an error event, not a cut-off
+        print(f"Error in {endpoint}:", e)
+        stream_stats.record_error(endpoint)
+        yield sse_event("error", {"detail": str(e)})
+        return
+    yield sse_event("metrics", with_timing(final))
+
+async def cached_events(cached, answer_key):
+    yield sse_event("token", {"text": cached["answer"]})
+    yield sse_event("metrics", {answer_key: cached["answer"], "message_id": cached.get("message_id"),
+                                "metrics": cached.get("metrics"), "ttft_ms": 0.0, "total_ms": 0.0, "cached": True})
+
+def event_stream(events):
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def search_documents(documents, question, k=4, vector=None):
+    # one document: plain similarity search; several: best k chunks across all of them
+    # (index_manager times loading an index that is not in memory as faiss_load).
+    # vector: the question's embedding when lookup_answer already computed it. Blocking: run it in a thread
+    if vector is None:
+        with timed("similarity_search"):
+            vector = index_manager.embeddings().embed_query(question)
+    if len(documents) == 1:
+        store = index_manager.get(documents[0]["index_path"])
+        with timed("similarity_search"):
+            return store.similarity_search_by_vector(vector, k=k)
+    scored = []
+    for document in documents:
+        store = index_manager.get(document["index_path"])
+        with timed("similarity_search"):
+            scored.extend(store.similarity_search_with_score_by_vector(vector, k=k))
+    scored.sort(key=lambda pair: pair[1])  # L2 distance, lower is closer
+    return [doc for doc, _ in scored[:k]]
+
+
+def discard_pdf(job, temp_path, document):
+    # the ingestion queue stopped before the job ran
+    index_registry.remove(document["document_id"])
+    os.remove(temp_path)
+
+
+async def ingest_pdf(job, temp_path, document):
+    try:
+        # Extract, chunk & embed (overlapped, see utils/pdf_pipeline.py)
+        vector_store = await build_index(temp_path, document["index_path"], index_manager.embeddings(),
+                                         progress=job.update)
+        if vector_store is None:
+            raise ValueError("No extractable text in PDF.")
+
+        # keep the fresh index in memory so the first questions do not reload it
+        index_manager.put(document["index_path"], vector_store)
+        index_registry.mark_ready(document["document_id"])
+    except BaseException:
+        index_registry.remove(document["document_id"])
+        raise
+    finally:
+        os.remove(temp_path)
+
+    for removed in index_registry.collect_garbage(keep={document["document_id"]}):
+        index_manager.evict(removed["index_path"])
+    return {"document_id": document["document_id"]}
+
+
+@app.post("/upload-pdf", status_code=202)
+async def upload_pdf(file: UploadFile = File(...), session_id: str | None = Form(None)):
+    temp_path = None
     try:
-        # Create temp file securely
+        # Create temp file securely, copying off the event loop
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
             temp_path = temp_file.name  # path to the saved temp file
-
-        # Extract text
-        text = extract_text_from_pdf(temp_path)
-
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="No extractable text in PDF.")
-
-        # Chunk & embed
-        current_index_name = f"faiss_index_{uuid.uuid4().hex}"
-        chunks = get_text_chunks(text)
-        get_vector_store(chunks, current_index_name)
-
-        return {"message": "PDF processed and index created."}
-
+            await asyncio.to_thread(shutil.copyfileobj, file.file, temp_file)
+
+        # indexing runs in the background; poll /jobs/{job_id} for progress
+        document = index_registry.new_document(session_id, file.filename)
+        job = ingestion_queue.submit(
+            "pdf", functools.partial(ingest_pdf, temp_path=temp_path, document=document),
+            discard=functools.partial(discard_pdf, temp_path=temp_path, document=document),
+            document_id=document["document_id"], filename=file.filename,
+        )
+        index_registry.register(document, ready=False)
+        temp_path = None  # owned by the job now
+
+        return {
+            "message": "PDF accepted for processing.",
+            "job_id": job.id,
+            "status": job.status,
+            "document_id": document["document_id"],
+            "session_id": document["session_id"],
+        }
+
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many uploads being processed, retry later.")
     except Exception as e:
         print("Upload Error:", e)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return job.to_dict()
+
+@app.get("/documents")
+async def list_documents(session_id: str):
+    return {"documents": [
+        {"status": d.get("status", "ready"), **{k: d[k] for k in ("document_id", "filename", "created_at")}}
+        for d in index_registry.session_documents(session_id)
+    ]}
 
 @app.post("/ask")
 async def ask_question(request: QueryRequest):
-    global current_index_name
-    if not current_index_name:
-        raise HTTPException(status_code=400, detail="No PDF content indexed. Upload PDF content first.")
+    documents = resolve_documents(request)
 
     try:
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        db = FAISS.load_local(current_index_name, embeddings, allow_dangerous_deserialization=True)
-        docs = db.similarity_search(request.question)
-
-        chain = get_conversational_chain()
-        result = chain(
-            {"input_documents": docs, "question": request.question},
-            return_only_outputs=True
-        )
+        cache_key, cached, embedding, vector = await asyncio.to_thread(lookup_answer, request, documents)
+        if cached is not None:
+            return with_timing({**cached, "cached": True})
+
+        docs = await asyncio.to_thread(search_documents, documents, request.question, vector=vector)
+
+        with timed("gemini_chain"):
+            chain = get_conversational_chain()
+            result = chain(
+                {"input_documents": docs, "question": request.question},
+                return_only_outputs=True
+            )
 
         answer_text = result["output_text"]
-        question_lower = request.question.lower()
-
-        # Define keyword sets and associated reference files
-        keyword_triggers = [
-            ({"ai", "applications"}, "reference/ref1_1.txt"),
-            ({"difference", "supervised", "unsupervised"}, "reference/ref2_1.txt"),
-            ({"machine learning", "deep learning"}, "reference/ref3_1.txt"),
-            ({"ml", "dl"}, "reference/ref3_1.txt")
-        ]
-
-        matched_ref_file = None
-        for keywords, ref_file in keyword_triggers:
-            if all(word in question_lower for word in keywords):
-                matched_ref_file = ref_file
-                break
+        with timed("reference_match"):
+            matched_ref_file = match_reference(request.question, ASK_REFERENCES)
 
         if matched_ref_file:
-            with open(matched_ref_file, "r", encoding="utf-8") as rf:
-                reference_lines = rf.readlines()
+            scores, timing = await scoring_pool.score_reference(matched_ref_file, answer_text)
+            print("Scores:", scores, "Scoring time:", timing)
+            message_id = log_interaction(request.question, answer_text, scores if matched_ref_file else None,
+                                         model=CHAT_MODEL, reference=matched_ref_file)
 
-            ref, hypo = load_textfiles(reference_lines, [answer_text])
-            scores = score(ref, hypo)
-            print("Scores:", scores)
-            log_interaction(request.question, answer_text, scores if matched_ref_file else None)
-
-            return {
+            response = {
                 "answer": answer_text,
+                "message_id": message_id,
                 "metrics": scores
             }
         else:
-            return {"answer": answer_text}
+            response = {"answer": answer_text, "message_id": new_message_id()}
+        answer_cache.put(cache_key, response, embedding)
+        return with_timing(response)
 
+    except ScoringQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         print("Error in /ask:", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ask/stream")
+async def ask_question_stream(request: QueryRequest):
+    documents = resolve_documents(request)
+    try:
+        cache_key, cached, embedding, vector = await asyncio.to_thread(lookup_answer, request, documents)
+        if cached is not None:
+            return event_stream(cached_events(cached, "answer"))
+        docs = await asyncio.to_thread(search_documents, documents, request.question, vector=vector)
+    except Exception as e:
+        print("Error in /ask/stream:", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def cache_answer(answer_text, metrics, message_id):
+        response = {"answer": answer_text, "message_id": message_id}
+        if metrics is not None:
+            response["metrics"] = metrics
+        answer_cache.put(cache_key, response, embedding)
+
+    return event_stream(stream_answer(
+        "/ask/stream", stream_chat_answer(docs, request.question), request.question, ASK_REFERENCES, "answer",
+        CHAT_MODEL, on_done=cache_answer,
+    ))
+
 @app.post("/feedback")
 async def store_feedback(feedback: FeedbackRequest):
     if feedback.feedback_type not in ["up", "down", None]:
         raise HTTPException(status_code=400, detail="Invalid feedback type")
 
     try:
-        # Create a cursor here, safer and avoids scope issues
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO feedbacks (message_id, feedback_type, comment) VALUES (%s, %s, %s)",
-                (feedback.message_id, feedback.feedback_type, feedback.comment)
-            )
-        conn.commit()
-        return {"message": "Feedback stored successfully"}
+        # buffered; written to the database in batches by the feedback writer thread
+        feedback_writer.submit(feedback.message_id, feedback.feedback_type, feedback.comment)
+    except FeedbackBufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    try:
+        # votes also go next to the interaction's scores, for /analysis?action=downvoted|feedback;
+        # one for an interaction still buffered by a log writer (of any worker) is attached when written.
+        # Off the event loop: SQLite may wait for another worker's write
+        await asyncio.to_thread(log_store.record_feedback, feedback.message_id, feedback.feedback_type)
     except Exception as e:
-        conn.rollback()
-        print("DB Insert Error:", e)  # log the error for debugging
-        raise HTTPException(status_code=500, detail="Failed to store feedback")
+        # the vote is already accepted by the feedback writer
+        print("Vote not attached to its interaction:", e)
+    return {"message": "Feedback received"}
     
 @app.post("/retry")
 async def retry(data: RetryRequest):
-    prompt = (
-        f"I have a question: {data.question}\n\n"
-        f"And an answer from a language model: {data.response}\n\n"
-        f"Please improve this answer to be more clear, accurate."
-    )
+    prompt = retry_prompt(data)
+    # a retry means the cached answer was not good enough: regenerate on the next /ask too
+    answer_cache.bypass()
+    answer_cache.invalidate_question(data.question)
 
     try:
-        improved_answer = await call_ollama_model(prompt)
-
-        question_lower = data.question.lower()
+        improved_answer = await ollama_client.generate(prompt)
 
-        # Define keyword sets and associated reference files
-        keyword_triggers = [
-            ({"ai", "applications"}, "reference/ref1_2.txt"),
-            ({"difference", "supervised", "unsupervised"}, "reference/ref2_2.txt"),
-            ({"machine learning", "deep learning"}, "reference/ref3_2.txt"),
-            ({"ml", "dl"}, "reference/ref3_2.txt")
-        ]
-
-        matched_ref_file = None
-        for keywords, ref_file in keyword_triggers:
-            if all(word in question_lower for word in keywords):
-                matched_ref_file = ref_file
-                break
+        with timed("reference_match"):
+            matched_ref_file = match_reference(data.question, RETRY_REFERENCES)
 
         if matched_ref_file:
-            with open(matched_ref_file, "r", encoding="utf-8") as rf:
-                reference_lines = rf.readlines()
-
-            ref, hypo = load_textfiles(reference_lines, [improved_answer])
-            scores = score(ref, hypo)
-            print("Scores:", scores)
-            log_interaction(data.question, improved_answer, scores if matched_ref_file else None)
+            scores, timing = await scoring_pool.score_reference(matched_ref_file, improved_answer)
+            print("Scores:", scores, "Scoring time:", timing)
+            message_id = log_interaction(data.question, improved_answer, scores if matched_ref_file else None,
+                                         model=ollama_client.model, reference=matched_ref_file)
 
-            return {
+            return with_timing({
                 "improved_answer": improved_answer,
+                "message_id": message_id,
                 "metrics": scores
-            }
+            })
         else:
-            return {"improved_answer": improved_answer}
+            return with_timing({"improved_answer": improved_answer, "message_id": new_message_id()})
 
-    except RuntimeError as e:
+    except ScoringQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        print("Error in /retry:", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/retry/stream")
+async def retry_stream(data: RetryRequest):
+    answer_cache.bypass()
+    answer_cache.invalidate_question(data.question)
+    return event_stream(stream_answer(
+        "/retry/stream", ollama_client.stream(retry_prompt(data)), data.question, RETRY_REFERENCES, "improved_answer",
+        ollama_client.model,
+    ))
+
 @app.get("/analysis")
 async def analysis(
-    action: str = Query("rank", enum=["rank", "bad", "regressions"]),
-    metric: str = Query("ROUGE_L")
+    action: str = Query("rank", enum=["rank", "bad", "regressions", "downvoted", "feedback", "series"]),
+    metric: str = Query("ROUGE_L"),
+    threshold: float = Query(0.5, description="score below which an answer is bad (bad, downvoted)"),
+    group_by: str = Query("question", enum=["question", "day", "model"], description="rollup dimension (feedback)"),
+    granularity: str = Query("day", enum=list(GRANULARITIES), description="bucket size (series)"),
+    series_by: str = Query("all", enum=SERIES_DIMENSIONS, description="one series per reference or model (series)"),
+    value: str | None = Query(None, description="only this reference or model (series)"),
+    metrics: list[str] | None = Query(None, description="metrics to include in each entry, default all"),
+    limit: int | None = Query(None, ge=1, le=500, description="page size, default 10 for rank, 100 for series and 50 otherwise"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    since: str | None = Query(None, description="ISO timestamp, inclusive"),
+    until: str | None = Query(None, description="ISO timestamp, exclusive"),
 ):
-    entries = load_logs()
-    if action == "rank":
-        ranked = rank_by_metric(entries, metric)
-        return {"top_answers": ranked[:10]}
-    elif action == "bad":
-        bad = surface_low_scores(entries, metric, threshold=0.5)
-        return {"low_scores": bad}
-    elif action == "regressions":
-        regs = detect_regressions(entries, metric)
-        return {"regressions": regs}
\ No newline at end of file
+    fields = metrics or METRICS
+    try:
+        if action == "rank":
+            ranked, next_cursor = metric_columns.top(metric, limit or 10, cursor, since, until, fields)
+            return {"top_answers": ranked, "next_cursor": next_cursor}
+        elif action == "bad":
+            bad, next_cursor = metric_columns.below(metric, threshold, limit or 50, cursor, since, until, fields)
+            return {"low_scores": bad, "next_cursor": next_cursor}
+        elif action == "downvoted":
+            bad, next_cursor = log_store.downvoted(metric, threshold, limit or 50, cursor, since, until, fields)
+            return {"downvoted": bad, "next_cursor": next_cursor}
+        elif action == "feedback":
+            rollups, next_cursor = log_store.rollups(group_by, limit or 50, cursor, fields)
+            return {"feedback": rollups, "next_cursor": next_cursor}
+        elif action == "series":
+            points, next_cursor = log_store.series(metric, granularity, series_by, value, limit or 100, cursor,
+                                                   since, until)
+            return {"series": points, "next_cursor": next_cursor}
+        elif action == "regressions":
+            # off the event loop: a cold start or a replaced log rereads every segment
+            await asyncio.to_thread(regression_detector.update)
+            regs, next_cursor = regression_detector.regressions(metric, limit or 50, cursor, since, until)
+            return {"regressions": regs, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Prometheus text exposition format
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats/scoring")
+async def scoring_stats():
+    return scoring_pool.stats()
+
+@app.get("/stats/feedback")
+async def feedback_stats():
+    return feedback_writer.stats()
+
+@app.get("/stats/logs")
+async def log_stats():
+    return {**log_writer.stats(), "columns": metric_columns.stats()}
+
+@app.get("/stats/answers")
+async def answer_cache_stats():
+    return answer_cache.stats()
+
+@app.get("/stats/streaming")
+async def streaming_stats():
+    return stream_stats.stats()
+
+@app.get("/stats/ollama")
+async def ollama_stats():
+    return ollama_client.stats()
+
+@app.get("/stats/indexes")
+async def index_stats():
+    return index_manager.stats()
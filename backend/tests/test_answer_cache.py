@@ -0,0 +1,61 @@
+from utils import answer_cache as cache_module
+from utils.answer_cache import AnswerCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def key(question, index_key="doc-1"):
+    return AnswerCache.make_key(index_key, question, "v1", "model")
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    cache = AnswerCache(ttl=60, max_entries=10)
+    cache.put(key("What is ML?"), {"answer": "ml"})
+
+    clock.now += 59
+    # case, whitespace and trailing punctuation are ignored
+    assert cache.get(key("  what is   ml"))[0] == {"answer": "ml"}
+    clock.now += 2
+    assert cache.get(key("What is ML?"))[0] is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(ttl=60, max_entries=2)
+    cache.put(key("a"), "A")
+    cache.put(key("b"), "B")
+    assert cache.get(key("a"))[0] == "A"  # b is now the least recently used
+    cache.put(key("c"), "C")
+
+    assert [cache.get(key(q))[0] for q in "abc"] == ["A", None, "C"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_near_duplicate_question_of_the_same_index():
+    vectors = {"what is ml": [1.0, 0.0], "define ml": [0.99, 0.1], "who are you": [0.0, 1.0]}
+    cache = AnswerCache(ttl=60, max_entries=10, similarity=0.95)
+    _, embedding = cache.get(key("What is ML?"), embed=vectors.get)
+    cache.put(key("What is ML?"), "ml", embedding)
+
+    assert cache.get(key("Define ML"), embed=vectors.get)[0] == "ml"
+    assert cache.get(key("Who are you?"), embed=vectors.get)[0] is None
+    assert cache.get(key("Define ML", index_key="doc-2"), embed=vectors.get)[0] is None
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_invalidate_question_drops_every_index():
+    cache = AnswerCache(ttl=60, max_entries=10)
+    cache.put(key("What is ML?"), "ml")
+    cache.put(key("what is ml", index_key="doc-2"), "ml 2")
+    cache.put(key("Other"), "other")
+    cache.invalidate_question("WHAT IS ML?")
+    assert cache.stats()["entries"] == 1
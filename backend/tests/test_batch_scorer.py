@@ -0,0 +1,23 @@
+import json
+
+from utils.batch_scorer import score_file
+
+
+def test_unreadable_reference_file_is_skipped(tmp_path):
+    reference = tmp_path / "ref.txt"
+    reference.write_text("machine learning learns patterns from data\n", encoding="utf-8")
+    records = [
+        {"question": "q1", "answer": "machine learning learns from data", "reference_file": str(reference)},
+        {"question": "q2", "answer": "anything", "reference_file": str(tmp_path / "missing.txt")},
+        {"question": "q3", "answer": "machine learning finds patterns", "reference_file": str(reference)},
+        {"question": "q4", "answer": "no reference at all"},
+    ]
+    path = tmp_path / "records.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+    out = tmp_path / "scored.jsonl"
+    summary = score_file(str(path), str(out))
+    assert (summary["scored"], summary["skipped"]) == (2, 2)
+    results = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [r["metrics"] is None for r in results] == [False, True, False, True]
+    assert 0 < summary["metrics"]["ROUGE_L"] <= 1
@@ -0,0 +1,32 @@
+from utils.embedding_cache import CachedEmbeddings, EmbeddingCache, HashEmbeddings
+
+
+class CountingEmbeddings(HashEmbeddings):
+    def __init__(self):
+        super().__init__(dim=16)
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def test_only_missing_texts_are_embedded_in_batches(tmp_path):
+    embedder = CountingEmbeddings()
+    path = str(tmp_path / "embeddings.db")
+    cached = CachedEmbeddings(embedder, "hash-16", EmbeddingCache(path), batch_size=2)
+    texts = ["alpha", "beta", "alpha", "gamma"]
+    first = cached.embed_documents(texts)
+    assert embedder.batches == [["alpha", "beta"], ["gamma"]]
+    assert first == HashEmbeddings(dim=16).embed_documents(texts)
+
+    # a new process reads them back from disk; another model does not share them
+    cached.cache.close()
+    again = CachedEmbeddings(embedder, "hash-16", EmbeddingCache(path), batch_size=2)
+    assert again.embed_documents(["gamma", "alpha", "delta"])[:2] == [first[3], first[0]]
+    assert embedder.batches[2:] == [["delta"]]
+    assert again.stats() == {"model": "hash-16", "hits": 2, "misses": 1}
+    other = CachedEmbeddings(embedder, "other-model", again.cache)
+    other.embed_documents(["alpha"])
+    assert embedder.batches[3:] == [["alpha"]]
+    again.cache.close()
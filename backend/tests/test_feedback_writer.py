@@ -0,0 +1,55 @@
+import threading
+import time
+
+from utils.feedback_writer import FeedbackWriter
+
+
+class FlakyDatabase:
+    """insert_many fails while self.failing is set; records the time of every call."""
+
+    def __init__(self):
+        self.failing = True
+        self.calls = []
+        self.rows = []
+        self.reconnects = 0
+        self._lock = threading.Lock()
+
+    def insert_many(self, table, columns, rows):
+        with self._lock:
+            self.calls.append(time.monotonic())
+            if self.failing:
+                raise OSError("database is down")
+            self.rows.extend(rows)
+
+
+def test_failing_database_is_retried_at_the_backoff_rate():
+    database = FlakyDatabase()
+    # batch_size=1: the buffer always holds a full batch, the case that used to busy-loop
+    writer = FeedbackWriter(database, batch_size=1, flush_interval=0.05)
+    writer.max_backoff = 0.2
+    for i in range(5):
+        writer.submit(i, "up", None)
+    time.sleep(1.0)
+    calls = list(database.calls)
+    # waits of 0.05, 0.1, 0.2, 0.2, ... seconds: a handful of attempts, not thousands
+    assert 3 <= len(calls) <= 10
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert min(gaps) >= 0.04
+    assert writer.stats()["failures"] == len(calls)
+    assert writer.pending == 5
+
+    database.failing = False
+    deadline = time.monotonic() + 2
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.02)
+    writer.close()
+    assert [row[0] for row in database.rows] == [0, 1, 2, 3, 4]
+
+
+def test_close_writes_what_is_buffered():
+    database = FlakyDatabase()
+    database.failing = False
+    writer = FeedbackWriter(database, batch_size=100, flush_interval=60)
+    writer.submit(1, "down", "wrong")
+    writer.close()
+    assert database.rows == [(1, "down", "wrong")]
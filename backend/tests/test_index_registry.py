@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from utils.index_registry import IndexRegistry
+
+
+def upload(registry, session_id=None, ready=True):
+    document = registry.new_document(session_id=session_id, filename="doc.pdf")
+    os.makedirs(document["index_path"])
+    return registry.register(document, ready=ready)
+
+
+def test_resolve_stays_within_the_session(tmp_path):
+    registry = IndexRegistry(index_dir=str(tmp_path))
+    mine = upload(registry, "alice")
+    theirs = upload(registry, "bob")
+
+    assert registry.resolve("alice") == [mine]
+    assert registry.resolve("bob") == [theirs]
+    # no session: nothing, rather than whichever upload is newest
+    assert registry.resolve() == []
+    assert registry.resolve("carol") == []
+
+    assert registry.resolve("alice", [mine["document_id"]]) == [mine]
+    for session_id in ("alice", None):
+        with pytest.raises(KeyError):
+            registry.resolve(session_id, [theirs["document_id"]])
+    with pytest.raises(KeyError):
+        registry.resolve("alice", ["no-such-document"])
+
+
+def test_resolve_skips_pending_uploads_unless_named(tmp_path):
+    registry = IndexRegistry(index_dir=str(tmp_path))
+    ready = upload(registry, "alice")
+    pending = upload(registry, "alice", ready=False)
+
+    assert registry.resolve("alice") == [ready]
+    assert registry.resolve("alice", [pending["document_id"]])[0]["status"] == "pending"
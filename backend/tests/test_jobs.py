@@ -0,0 +1,27 @@
+import asyncio
+
+from utils.jobs import JobQueue
+
+
+def test_stop_fails_running_and_queued_jobs():
+    discarded = []
+
+    async def scenario():
+        queue = JobQueue(workers=1, max_queued=5)
+        started = asyncio.Event()
+
+        async def run(job):
+            started.set()
+            await asyncio.sleep(60)
+
+        running = queue.submit("test", run, discard=discarded.append)
+        queued = [queue.submit("test", run, discard=discarded.append) for _ in range(3)]
+        await started.wait()
+        await queue.stop()
+        return running, queued
+
+    running, queued = asyncio.run(scenario())
+    assert running.status == "failed" and running not in discarded
+    assert discarded == queued
+    for job in [running, *queued]:
+        assert job.status == "failed" and job.stage == "failed" and job.finished_at is not None
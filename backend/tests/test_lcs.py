@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from rouge.lcs import TokenVocab, batch_lcs, lcs_length
+from rouge.rouge import Rouge, my_lcs
+
+
+def rouge_l(candidate, refs, beta=1.2):
+    # calc_score as it was before the bit-parallel backend, on my_lcs
+    token_c = candidate.split(" ")
+    lcs = [my_lcs(ref.split(" "), token_c) for ref in refs]
+    prec_max = max(l / float(len(token_c)) for l in lcs)
+    rec_max = max(l / float(len(ref.split(" "))) for l, ref in zip(lcs, refs))
+    if prec_max != 0 and rec_max != 0:
+        return ((1 + beta**2) * prec_max * rec_max) / float(rec_max + beta**2 * prec_max)
+    return 0.0
+
+
+def random_tokens(rng, length, alphabet):
+    return [f"w{rng.randrange(alphabet)}" for _ in range(length)]
+
+
+# lengths around the 64-bit word size, empty and single tokens; small alphabets repeat tokens
+@pytest.mark.parametrize("lengths", [(0, 0), (0, 5), (1, 1), (3, 7), (63, 64), (64, 65), (100, 130), (200, 7)])
+@pytest.mark.parametrize("alphabet", [1, 3, 50])
+def test_lcs_length_matches_my_lcs(lengths, alphabet):
+    rng = random.Random(f"{lengths}-{alphabet}")
+    vocab = TokenVocab()
+    for _ in range(5):
+        a = random_tokens(rng, lengths[0], alphabet)
+        b = random_tokens(rng, lengths[1], alphabet)
+        expected = my_lcs(a, b)
+        assert lcs_length(vocab.encode(a), vocab.encode(b)) == expected
+        assert batch_lcs([(b, [a, b])]) == [[expected, len(b)]]
+
+
+def test_calc_score_matches_the_my_lcs_formula():
+    rng = random.Random(1)
+    rouge = Rouge()
+    pairs = []
+    for _ in range(200):
+        candidate = " ".join(random_tokens(rng, rng.randint(1, 150), rng.choice([2, 10, 80])))
+        refs = [" ".join(random_tokens(rng, rng.randint(1, 150), 10)) for _ in range(rng.randint(1, 3))]
+        pairs.append(([candidate], refs))
+    # repeated tokens and a reference equal to the candidate
+    pairs.append((["a a a a"], ["a", "a a a a a a"]))
+    pairs.append((["same words here"], ["same words here"]))
+    expected = [rouge_l(candidate[0], refs) for candidate, refs in pairs]
+    assert rouge.calc_scores(pairs) == expected
+    assert [rouge.calc_score(candidate, refs) for candidate, refs in pairs] == expected
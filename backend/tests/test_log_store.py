@@ -0,0 +1,100 @@
+import json
+import sqlite3
+
+from benchmarks.generators import log_entries
+from utils.log_store import LogStore
+
+
+def rollup(store, dimension, value):
+    return dict(store._query("SELECT * FROM rollups WHERE dimension = ? AND value = ?", (dimension, value))[0])
+
+
+def test_colliding_message_ids_keep_one_row_per_id(tmp_path):
+    store = LogStore(str(tmp_path / "qa_log.db"))
+    first, second, third = log_entries(3, 1, seed=2)
+    second["message_id"] = third["message_id"] = first["message_id"]
+    store.append_many([first])
+    assert store.append_many([second, third]) == 2
+
+    assert store.count() == 3
+    assert store._query("SELECT COUNT(*) FROM interactions WHERE message_id = ?", (first["message_id"],))[0][0] == 1
+    assert store.record_feedback(first["message_id"], "down")
+    assert store.record_feedback(first["message_id"], "up")
+    counts = rollup(store, "model", "stub")
+    assert (counts["interactions"], counts["up"], counts["down"]) == (3, 1, 0)
+    store.close()
+
+
+def test_non_unique_message_index_is_migrated(tmp_path):
+    path = str(tmp_path / "qa_log.db")
+    store = LogStore(path)
+    entries = list(log_entries(4, 1, seed=3))
+    store.append_many(entries)
+    store.close()
+
+    # a store written before the index was unique: one entry imported twice, one colliding ID
+    conn = sqlite3.connect(path)
+    conn.execute("DROP INDEX idx_interactions_message")
+    conn.execute("CREATE INDEX idx_interactions_message ON interactions(message_id)")
+    conn.execute("INSERT INTO interactions (timestamp, question, question_norm, answer, message_id, model) "
+                 "SELECT timestamp, question, question_norm, answer, message_id, model FROM interactions WHERE id = 1")
+    conn.execute("INSERT INTO interactions (timestamp, question, question_norm, answer, message_id, model) "
+                 "VALUES ('2030-01-01T00:00:00', 'other', 'other', 'other answer', ?, 'stub')",
+                 (entries[1]["message_id"],))
+    conn.execute("UPDATE rollups SET interactions = interactions + 2 WHERE dimension = 'model'")
+    conn.commit()
+    conn.close()
+
+    store = LogStore(path)
+    assert store.count() == 5
+    assert store._query("SELECT COUNT(*) FROM interactions WHERE message_id IS NULL")[0][0] == 1
+    assert store._query("SELECT question FROM interactions WHERE message_id = ?",
+                        (entries[1]["message_id"],))[0][0] == entries[1]["question"]
+    assert rollup(store, "model", "stub")["interactions"] == 5
+    unique = {r["name"]: r["unique"] for r in store._query("PRAGMA index_list(interactions)")}
+    assert unique["idx_interactions_message"] == 1
+    store.close()
+
+
+def test_import_is_idempotent(tmp_path):
+    log = tmp_path / "qa_log.jsonl"
+    entries = list(log_entries(50, 5, seed=4))
+    for entry in entries[:10]:
+        del entry["message_id"]  # legacy entries without IDs
+    log.write_text("".join(json.dumps(e) + "\n" for e in entries), encoding="utf-8")
+
+    store = LogStore(str(tmp_path / "qa_log.db"))
+    assert store.import_jsonl(str(log), batch_size=7) == 50
+    bins = store._query("SELECT SUM(count) FROM metric_bins")[0][0]
+
+    assert store.import_jsonl(str(log), batch_size=7) == 0
+    more = list(log_entries(60, 5, seed=4))[50:]
+    with log.open("a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(e) + "\n" for e in more))
+    assert store.import_jsonl(str(log)) == 10
+
+    assert store.count() == 60
+    assert store._query("SELECT SUM(count) FROM metric_bins")[0][0] == bins * 60 // 50
+    after = {r["value"]: r["interactions"] for r in store._query("SELECT * FROM rollups WHERE dimension = 'model'")}
+    assert after == {"stub": 60}
+    store.close()
+
+
+def test_vote_before_the_interaction_is_applied_on_append(tmp_path):
+    store = LogStore(str(tmp_path / "qa_log.db"))
+    first, second = log_entries(2, 1, seed=5)
+    assert not store.record_feedback(first["message_id"], "up")
+    assert not store.record_feedback(first["message_id"], "down")  # changed before it landed
+    assert not store.record_feedback(second["message_id"] + 1000, "up")  # never logged
+
+    store.append_many([first, second])
+    assert store.votes([first["message_id"], second["message_id"]]) == {first["message_id"]: "down"}
+    counts = rollup(store, "model", "stub")
+    assert (counts["interactions"], counts["up"], counts["down"]) == (2, 0, 1)
+    assert store._query("SELECT COUNT(*) FROM pending_votes")[0][0] == 1
+
+    # applied once: the vote is no longer pending
+    assert store.record_feedback(first["message_id"], "up")
+    counts = rollup(store, "model", "stub")
+    assert (counts["up"], counts["down"]) == (1, 0)
+    store.close()
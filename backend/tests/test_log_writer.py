@@ -0,0 +1,83 @@
+import json
+import os
+import time
+
+from benchmarks.generators import log_entries
+from utils.log_writer import LogWriter, iter_log_lines, read_manifest
+
+
+def test_unwritable_log_is_retried_at_the_backoff_rate(tmp_path):
+    # the log's directory is a regular file: every write fails
+    (tmp_path / "logs").write_text("")
+    writer = LogWriter(str(tmp_path / "logs" / "qa_log.jsonl"), batch_size=1, flush_interval=0.05)
+    writer.max_backoff = 0.2
+    for entry in log_entries(5, 5):
+        writer.write(entry)
+    time.sleep(1.0)
+    failures = writer.stats()["failures"]
+    writer.close(timeout=0)
+    # waits of 0.05, 0.1, 0.2, 0.2, ... seconds: a handful of attempts, not thousands
+    assert 3 <= failures <= 10
+    assert writer.pending == 5
+
+
+def test_rotated_log_reads_as_one(tmp_path):
+    path = str(tmp_path / "qa_log.jsonl")
+    writer = LogWriter(path, batch_size=50, rotate_bytes=20_000, fsync="off")
+    entries = list(log_entries(2000, 40))
+    for entry in entries:
+        writer.write(entry)
+    writer.close()
+
+    segments = read_manifest(path)["segments"]
+    assert writer.rotations == len(segments) > 3
+    assert all(os.path.exists(tmp_path / s["file"]) for s in segments)  # compressed
+    first_line = 0
+    for segment in segments:
+        assert segment["first_line"] == first_line
+        first_line += segment["lines"]
+    assert [json.loads(line) for line in iter_log_lines(path)] == entries
+
+    since, until = entries[500]["timestamp"], entries[1500]["timestamp"]
+    lines = [json.loads(line) for line in iter_log_lines(path, since, until)]
+    # whole segments outside the range are skipped, lines are not filtered
+    assert entries[500:1500] == [e for e in lines if since <= e["timestamp"] < until]
+    assert len(lines) < len(entries)
+
+
+class FlakyStore:
+    def __init__(self):
+        self.failing = True
+        self.entries = []
+
+    def append_many(self, entries):
+        if self.failing:
+            raise OSError("database is locked")
+        self.entries.extend(entries)
+        return len(entries)
+
+
+def test_failed_store_batches_are_retried(tmp_path):
+    store = FlakyStore()
+    writer = LogWriter(str(tmp_path / "qa_log.jsonl"), store=store, batch_size=4, fsync="off")
+    entries = list(log_entries(10, 5))
+    for entry in entries[:6]:
+        writer.write(entry)
+    writer.flush()  # the log is written even though the store fails
+    assert writer.stats()["store_backlog"] == 6 and writer.stats()["store_failures"] == 1
+    assert len(list(iter_log_lines(writer.path))) == 6
+
+    store.failing = False
+    for entry in entries[6:]:
+        writer.write(entry)
+    writer.close()
+    assert store.entries == entries and writer.pending == 0
+
+
+def test_write_drops_lines_instead_of_blocking(tmp_path):
+    writer = LogWriter(str(tmp_path / "qa_log.jsonl"), batch_size=100, max_buffered=3, fsync="off")
+    writer.start = lambda: None  # no flusher: nothing drains the buffer
+    for entry in log_entries(10, 5):
+        writer.write(entry)
+    assert writer.pending == 3 and writer.stats()["dropped"] == 7
+    assert not os.path.exists(writer.path)
@@ -0,0 +1,56 @@
+import pytest
+
+from benchmarks.generators import log_entries
+from utils.log_store import LogStore
+from utils.log_writer import LogWriter
+from utils.metric_columns import MetricColumns
+
+
+@pytest.fixture
+def stores(tmp_path):
+    entries = list(log_entries(400, 40, seed=6))
+    for entry in entries[::9]:
+        del entry["metrics"]["ROUGE_L"]  # missing scores are never ranked
+    store = LogStore(str(tmp_path / "qa_log.db"))
+    columns = MetricColumns(str(tmp_path / "columns"), store=store)
+    writer = LogWriter(str(tmp_path / "qa_log.jsonl"), batch_size=64, store=store, columns=columns, fsync="off")
+    for entry in entries:
+        writer.write(entry)
+    writer.close()
+    for entry in entries[:30:3]:
+        store.record_feedback(entry["message_id"], "down")
+    yield store, columns
+    store.close()
+
+
+def pages(query, **kwargs):
+    entries, cursor = query(limit=7, **kwargs)
+    while cursor:
+        page, cursor = query(limit=7, cursor=cursor, **kwargs)
+        assert page
+        entries += page
+    return entries
+
+
+def same_entries(from_columns, from_store):
+    assert [e["message_id"] for e in from_columns] == [e["message_id"] for e in from_store]
+    for a, b in zip(from_columns, from_store):
+        assert {k: v for k, v in a.items() if k != "metrics"} == {k: v for k, v in b.items() if k != "metrics"}
+        assert a["metrics"] == pytest.approx(b["metrics"], rel=1e-6)
+
+
+@pytest.mark.parametrize("window", [{}, {"since": "2025-01-01T00:01:00", "until": "2025-01-01T00:05:00"}])
+def test_top_pages_match_the_log_store(stores, window):
+    store, columns = stores
+    from_store = pages(store.top, metric_name="ROUGE_L", **window)
+    assert len(from_store) > 7
+    same_entries(pages(columns.top, metric_name="ROUGE_L", **window), from_store)
+
+
+@pytest.mark.parametrize("window", [{}, {"since": "2025-01-01T00:01:00", "until": "2025-01-01T00:05:00"}])
+def test_below_pages_match_the_log_store(stores, window):
+    store, columns = stores
+    from_store = pages(store.below, metric_name="ROUGE_L", threshold=0.4, **window)
+    assert len(from_store) > 7
+    assert any(e.get("feedback") == "down" for e in pages(store.below, metric_name="ROUGE_L", threshold=0.4))
+    same_entries(pages(columns.below, metric_name="ROUGE_L", threshold=0.4, **window), from_store)
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from utils import ollama_client as ollama
+from utils.ollama_client import OllamaClient, OllamaError
+
+
+def make_client(handler, **kwargs):
+    return OllamaClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def generate(client, prompt="question"):
+    async def run():
+        try:
+            return await client.generate(prompt)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_server_errors_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(json.loads(request.content))
+        if len(calls) == 1:
+            return httpx.Response(503, text="loading model")
+        return httpx.Response(200, json={"response": " an answer \n"})
+
+    client = make_client(handler, retries=1)
+    assert generate(client) == "an answer"
+    assert len(calls) == 2 and calls[0]["prompt"] == "question" and calls[0]["stream"] is False
+    assert (client.retried, client.failures) == (1, 0)
+
+
+def test_failure_after_the_last_retry():
+    client = make_client(lambda request: httpx.Response(500, text="boom"), retries=1)
+    with pytest.raises(OllamaError, match="500 boom"):
+        generate(client)
+    assert (client.requests, client.failures) == (1, 1)
+
+
+@pytest.mark.parametrize("response", [
+    httpx.Response(200, text="not json"),
+    httpx.Response(200, json={"done": True}),
+    httpx.Response(200, json=["response"]),
+])
+def test_malformed_response_is_an_ollama_error(response):
+    client = make_client(lambda request: response, retries=0)
+    with pytest.raises(OllamaError, match="Malformed"):
+        generate(client)
+
+
+def test_unreachable_api_falls_back_to_the_cli(monkeypatch):
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    monkeypatch.setattr(ollama, "run_ollama_cli", lambda prompt, model: f"cli: {prompt}")
+    client = make_client(refuse)
+    assert generate(client) == "cli: question"
+    assert client.fallbacks == 1 and client.retried == 0
+
+    client = make_client(refuse, cli_fallback=False)
+    with pytest.raises(ollama.OllamaUnreachable):
+        generate(client)
+
+
+def test_stream_yields_the_pieces():
+    lines = [{"response": "an "}, {"response": "answer"}, {"response": "", "done": True}]
+    body = "".join(json.dumps(line) + "\n" for line in lines)
+    client = make_client(lambda request: httpx.Response(200, text=body))
+
+    async def run():
+        try:
+            return [piece async for piece in client.stream("question")]
+        finally:
+            await client.aclose()
+    assert asyncio.run(run()) == ["an ", "answer"]
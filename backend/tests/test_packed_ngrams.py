@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+
+from bleu.bleu_scorer import BleuScorer, cook_refs, cook_test
+from bleu.packed_ngrams import PackedNgramCounts
+
+# largest reference vocabulary whose 4-gram keys still fit in int64
+INT64_RADIX = int(round((2**63 - 1) ** 0.25))
+while INT64_RADIX**4 > 2**63 - 1:
+    INT64_RADIX -= 1
+
+
+def sentence(rng, length, alphabet):
+    return " ".join(f"w{rng.randrange(alphabet)}" for _ in range(length))
+
+
+def random_corpus(seed, size=60):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        alphabet = rng.choice([2, 5, 30, 500])
+        refs = [sentence(rng, rng.randint(0, 40), alphabet) for _ in range(rng.randint(1, 4))]
+        # a bigger alphabet than the references: some test tokens are unknown to them
+        test = sentence(rng, rng.randint(0, 40), alphabet + 3)
+        corpus.append((test, refs))
+    return corpus
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n", [1, 2, 4])
+def test_packed_cooking_matches_the_dict_path(seed, n):
+    for test, refs in random_corpus(seed):
+        for eff in (None, "closest", "shortest", "average"):
+            cooked = cook_test(test, cook_refs(refs, eff, n), eff, n)
+            assert cook_test(test, cook_refs(refs, eff, n, packed=True), eff, n) == cooked
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("option", ["closest", "shortest", "average"])
+def test_packed_scores_are_identical(seed, option):
+    corpus = random_corpus(seed)
+    scores = []
+    for packed in (False, True):
+        scorer = BleuScorer(n=4, packed=packed)
+        for test, refs in corpus:
+            scorer += (test, refs)
+        scores.append(scorer.compute_score(option=option))
+    assert scores[0] == scores[1]
+
+
+@pytest.mark.parametrize("radix", [INT64_RADIX, INT64_RADIX + 1])
+def test_keys_at_the_packing_width(radix):
+    # the int64 path up to INT64_RADIX distinct reference tokens, Python ints beyond;
+    # n-grams of the highest token ids produce the largest keys
+    rng = random.Random(radix)
+    vocab = [f"t{i}" for i in range(radix)]
+    top = vocab[-6:]
+    refs = [" ".join(vocab), " ".join(top * 3 + vocab[:50])]
+    test = " ".join(top + top[::-1] + [rng.choice(vocab) for _ in range(200)] + ["unknown"] + top)
+
+    packed_refs = cook_refs(refs, n=4, packed=True)
+    assert packed_refs[1].dtype is (np.int64 if radix == INT64_RADIX else object)
+    assert isinstance(packed_refs[1], PackedNgramCounts)
+    assert cook_test(test, packed_refs) == cook_test(test, cook_refs(refs, n=4))
@@ -0,0 +1,68 @@
+import json
+import threading
+
+from benchmarks.generators import log_entries
+from utils.log_writer import LogWriter
+from utils.regressions import RegressionDetector
+
+
+def test_detector_follows_rotations(tmp_path):
+    path = str(tmp_path / "qa_log.jsonl")
+    writer = LogWriter(path, batch_size=37, rotate_bytes=20_000, fsync="off")
+    incremental = RegressionDetector(path, str(tmp_path / "incremental.json"), window=3, threshold=0.05)
+    entries = list(log_entries(3000, 30, seed=1))
+    for start in range(0, len(entries), 250):
+        for entry in entries[start:start + 250]:
+            writer.write(entry)
+        writer.flush()
+        incremental.update()
+        # a restart reloads the persisted position
+        incremental = RegressionDetector(path, str(tmp_path / "incremental.json"), window=3, threshold=0.05)
+    writer.close()
+    assert writer.rotations > 3
+
+    scratch = RegressionDetector(path, str(tmp_path / "scratch.json"), window=3, threshold=0.05)
+    assert scratch.update() == len(entries)
+    assert incremental.update() == 0
+    assert incremental.state["questions"] == scratch.state["questions"]
+    assert incremental.regressions("ROUGE_L") == scratch.regressions("ROUGE_L")
+
+
+def test_detector_starts_over_when_the_log_is_replaced(tmp_path):
+    path = tmp_path / "qa_log.jsonl"
+    entries = list(log_entries(100, 10))
+    path.write_text("".join(json.dumps(e) + "\n" for e in entries))
+    detector = RegressionDetector(str(path), str(tmp_path / "state.json"))
+    assert detector.update() == 100
+
+    path.write_text("".join(json.dumps(e) + "\n" for e in entries[:10]))
+    assert detector.update() == 10
+    assert detector.state["offset"] == path.stat().st_size
+
+
+def test_concurrent_saves_do_not_share_a_temp_file(tmp_path):
+    path = str(tmp_path / "qa_log.jsonl")
+    writer = LogWriter(path, fsync="off")
+    for entry in log_entries(200, 10, seed=2):
+        writer.write(entry)
+    writer.close()
+    # one detector per worker, saving the same state file
+    detectors = [RegressionDetector(path, str(tmp_path / "state.json")) for _ in range(4)]
+    for detector in detectors:
+        detector.update()
+    errors = []
+
+    def save(detector):
+        try:
+            for _ in range(50):
+                detector._save_state()
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=save, args=(d,)) for d in detectors]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert json.loads((tmp_path / "state.json").read_text())["questions"] == detectors[0].state["questions"]
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+import server
+
+
+async def pieces():
+    yield "an "
+    yield "answer"
+
+
+def events(monkeypatch, score_reference):
+    monkeypatch.setattr(server, "match_reference", lambda question, references: "reference/ref.txt")
+    monkeypatch.setattr(server.scoring_pool, "score_reference", score_reference)
+
+    async def collect():
+        return [event async for event in server.stream_answer(
+            "/test/stream", pieces(), "question", {}, "answer", "model")]
+    return asyncio.run(collect())
+
+
+def test_scoring_failure_ends_the_stream_with_an_error_event(monkeypatch):
+    async def broken(ref_file, answer):
+        raise RuntimeError("worker died")
+
+    errors = server.stream_stats.errors.get("/test/stream", 0)
+    sent = events(monkeypatch, broken)
+    assert len(sent) == 3 and "token" in sent[0] and "token" in sent[1]
+    assert sent[2].startswith("event: error") and "worker died" in sent[2]
+    assert server.stream_stats.errors["/test/stream"] == errors + 1
+
+
+def test_full_scoring_queue_still_sends_the_answer(monkeypatch):
+    async def full(ref_file, answer):
+        raise server.ScoringQueueFull("Scoring queue is full")
+
+    sent = events(monkeypatch, full)
+    assert sent[-1].startswith("event: metrics")
+    data = json.loads(sent[-1].split("data: ", 1)[1])
+    assert data["answer"] == "an answer" and data["error"] == "Scoring queue is full"
@@ -0,0 +1,120 @@
+# answer_cache.py
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 3600))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+# cosine similarity above which a differently worded question reuses a cached answer; 0 disables
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0))
+
+
+def canonical_question(question):
+    # case, whitespace and trailing punctuation do not change the answer
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?.!").strip()
+
+
+class AnswerCache:
+    """
+    LRU cache of answers (and their metrics) keyed by (index key, canonical question,
+    prompt version, model). Entries expire after ttl seconds. With a similarity
+    threshold and an embed function, a miss falls back to the cached question with
+    the closest embedding for the same index, prompt and model.
+    """
+
+    def __init__(self, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES, similarity=ANSWER_CACHE_SIMILARITY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._entries = OrderedDict()  # key -> (expires_at, value, unit embedding or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(index_key, question, prompt_version, model):
+        return (index_key, canonical_question(question), prompt_version, model)
+
+    def get(self, key, embed=None):
+        """
+        :param embed: optional callable(question) -> vector, used for near-duplicate lookup
+        :returns: (value or None, query embedding or None); pass the embedding on to put()
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], entry[2]
+                del self._entries[key]
+                self.expired += 1
+
+        embedding = None
+        if self.similarity > 0 and embed is not None:
+            import numpy as np
+            embedding = np.asarray(embed(key[1]), dtype=np.float32)
+            norm = np.linalg.norm(embedding)
+            if norm:
+                embedding /= norm
+            with self._lock:
+                best, best_score = None, self.similarity
+                for other, (expires_at, _, other_embedding) in self._entries.items():
+                    if other_embedding is None or expires_at <= now or other[0] != key[0] or other[2:] != key[2:]:
+                        continue
+                    score = float(np.dot(embedding, other_embedding))
+                    if score >= best_score:
+                        best, best_score = other, score
+                if best is not None:
+                    self._entries.move_to_end(best)
+                    self.near_hits += 1
+                    return self._entries[best][1], embedding
+
+        with self._lock:
+            self.misses += 1
+        return None, embedding
+
+    def put(self, key, value, embedding=None):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def invalidate_question(self, question):
+        """Drops the cached answers to question for every index, prompt and model."""
+        canonical = canonical_question(question)
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == canonical]:
+                del self._entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "similarity": self.similarity,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+answer_cache = AnswerCache()
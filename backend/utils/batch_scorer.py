@@ -0,0 +1,182 @@
+# batch_scorer.py
+"""Re-scores many question/answer/reference records in one go.
+
+Usage (from backend/):
+    python -m utils.batch_scorer logs/qa_log.jsonl -o scored.jsonl --summary summary.json
+
+Each input line is a JSON object with a question and an answer, plus either a
+"reference" (reference text), a "reference_file" (path), or neither, in which
+case the reference is matched from the question like /ask (or /retry with
+--variant retry) does. Records whose reference file cannot be read are skipped
+like records without a reference. Records are streamed in chunks and each chunk
+is scored with a single BleuScorer and one batched Rouge call.
+"""
+import argparse
+import itertools
+import json
+import sys
+
+from bleu.bleu_scorer import BleuScorer
+from rouge.rouge import Rouge
+from utils.reference_store import join_reference_lines, reference_store
+from utils.references import ASK_REFERENCES, RETRY_REFERENCES, match_reference
+
+BLEU_METRICS = ["Bleu_1", "Bleu_2", "Bleu_3", "Bleu_4"]
+ROUGE_METRIC = "ROUGE_L"
+_unreadable = set()  # reference files already reported as unreadable
+
+
+def iter_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def resolve_reference(record, keyword_triggers=ASK_REFERENCES, question_field="question"):
+    # returns (label, text, cooked BLEU refs or None), or None when there is nothing to score against
+    if record.get("reference") is not None:
+        return None, join_reference_lines(record["reference"].splitlines()), None
+    ref_file = record.get("reference_file") or match_reference(record.get(question_field, ""), keyword_triggers)
+    if not ref_file:
+        return None
+    try:
+        ref = reference_store.get(ref_file)
+    except (OSError, UnicodeDecodeError) as e:
+        # skipped like an unmatched record, so one bad path does not end a long run
+        if ref_file not in _unreadable:
+            _unreadable.add(ref_file)
+            print(f"Reference not loaded, its records are skipped: {ref_file}: {e}", file=sys.stderr)
+        return None
+    return ref_file, ref.text, ref.cooked
+
+
+class BatchScorer:
+    """Scores chunks of (answer, reference) items and accumulates corpus-level totals.
+    Corpus BLEU is computed from summed n-gram counts and lengths, i.e. the value
+    Bleu.compute_score would return over all items at once; ROUGE_L is the mean."""
+
+    def __init__(self, n=4):
+        self.n = n
+        self.rouge = Rouge()
+        self.count = 0
+        self.testlen = 0
+        self.reflen = 0
+        self.guess = [0] * n
+        self.correct = [0] * n
+        self.rouge_sum = 0.0
+
+    def score_chunk(self, items):
+        """
+        :param items: list of (answer, reference text, cooked refs or None)
+        :returns: list of metric dicts, one per item
+        """
+        bleu_scorer = BleuScorer(n=self.n)
+        for answer, ref_text, cooked in items:
+            if cooked is not None:
+                bleu_scorer.cook_append_cooked(answer, cooked)
+            else:
+                bleu_scorer += (answer, [ref_text])
+        _, bleu_list = bleu_scorer.compute_score(option="closest")
+        rouge_scores = self.rouge.calc_scores([([answer], [ref_text]) for answer, ref_text, _ in items])
+
+        results = []
+        for i, comps in enumerate(bleu_scorer.ctest):
+            testlen = comps["testlen"]
+            self.testlen += testlen
+            self.reflen += min((abs(l - testlen), l) for l in comps["reflen"])[1]
+            for k in range(self.n):
+                self.guess[k] += comps["guess"][k]
+                self.correct[k] += comps["correct"][k]
+            self.rouge_sum += rouge_scores[i]
+            self.count += 1
+
+            metrics = {m: bleu_list[k][i] for k, m in enumerate(BLEU_METRICS[:self.n])}
+            metrics[ROUGE_METRIC] = rouge_scores[i]
+            results.append(metrics)
+        return results
+
+    def corpus_metrics(self):
+        if not self.count:
+            return {}
+        totals = BleuScorer(n=self.n, special_reflen=self.reflen)
+        totals.ctest = [{"testlen": self.testlen, "reflen": self.reflen,
+                         "guess": self.guess, "correct": self.correct}]
+        totals.crefs = [None]
+        metrics = dict(zip(BLEU_METRICS, totals.compute_score()[0]))
+        metrics[ROUGE_METRIC] = self.rouge_sum / self.count
+        return metrics
+
+
+def score_records(records, chunk_size=1000, keyword_triggers=ASK_REFERENCES,
+                  question_field="question", answer_field="answer", scorer=None):
+    """
+    Streams records through a BatchScorer.
+    :yields: (record, reference label, metrics dict or None when no reference matched)
+    """
+    scorer = scorer or BatchScorer()
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+
+        resolved = [resolve_reference(r, keyword_triggers, question_field) for r in chunk]
+        items = [(r.get(answer_field) or "", ref[1], ref[2]) for r, ref in zip(chunk, resolved) if ref]
+        metrics = iter(scorer.score_chunk(items) if items else [])
+
+        for record, ref in zip(chunk, resolved):
+            yield record, ref[0] if ref else None, next(metrics) if ref else None
+
+
+def score_file(in_path, out_path=None, chunk_size=1000, variant="ask",
+               question_field="question", answer_field="answer"):
+    """Scores a JSONL file, writes one result line per record to out_path
+    (stdout when None) and returns the corpus-level summary."""
+    triggers = RETRY_REFERENCES if variant == "retry" else ASK_REFERENCES
+    scorer = BatchScorer()
+    skipped = 0
+
+    out = open(out_path, "w", encoding="utf-8") if out_path else sys.stdout
+    try:
+        results = score_records(iter_records(in_path), chunk_size, triggers,
+                                question_field, answer_field, scorer)
+        for index, (record, ref_label, metrics) in enumerate(results):
+            if metrics is None:
+                skipped += 1
+            out.write(json.dumps({
+                "index": index,
+                "question": record.get(question_field),
+                "reference": ref_label,
+                "metrics": metrics,
+            }) + "\n")
+    finally:
+        if out_path:
+            out.close()
+
+    return {"scored": scorer.count, "skipped": skipped, "metrics": scorer.corpus_metrics()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a JSONL file of question/answer records with BLEU and ROUGE-L.")
+    parser.add_argument("input", help="JSONL file, e.g. logs/qa_log.jsonl")
+    parser.add_argument("-o", "--output", help="per-item results (JSONL), default stdout")
+    parser.add_argument("--summary", help="write corpus-level metrics to this JSON file instead of stderr")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--variant", choices=["ask", "retry"], default="ask",
+                        help="which reference set to match questions against")
+    parser.add_argument("--question-field", default="question")
+    parser.add_argument("--answer-field", default="answer")
+    args = parser.parse_args(argv)
+
+    summary = score_file(args.input, args.output, args.chunk_size, args.variant,
+                         args.question_field, args.answer_field)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# buffered_writer.py
+"""Flusher thread shared by the write-behind buffers (feedback_writer, log_writer)."""
+import threading
+import time
+import traceback
+from collections import deque
+
+MAX_BACKOFF = 30.0
+
+
+class BufferedWriter:
+    """
+    Base of a write-behind buffer. Subclasses append to self._buffer under self._cond
+    (notifying once batch_size items are waiting) and implement flush(), which writes
+    the buffer and raises, keeping the items, when the write fails. The flusher thread
+    flushes as soon as batch_size items are waiting or every flush_interval seconds.
+    After a failed flush it always waits the backoff, doubled on every failure up to
+    max_backoff, however much is buffered, so a failing database or disk is retried
+    at that rate instead of in a busy loop.
+    """
+    thread_name = "buffered-writer"
+
+    def __init__(self, batch_size, flush_interval, max_buffered, max_backoff=MAX_BACKOFF):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.max_backoff = max_backoff
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def flush(self):
+        raise NotImplementedError
+
+    def _run(self):
+        backoff = None  # seconds to wait after the last flush failed
+        while True:
+            with self._cond:
+                if backoff is not None:
+                    self._cond.wait_for(lambda: self._stopping, timeout=backoff)
+                elif not self._stopping and len(self._buffer) < self.batch_size:
+                    self._cond.wait(timeout=self.flush_interval)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+                backoff = None
+            except Exception:
+                traceback.print_exc()
+                backoff = max(self.flush_interval, 0.1) if backoff is None else min(backoff * 2, self.max_backoff)
+
+    def close(self, timeout=10.0):
+        """Stops the flusher thread and writes what is left."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            try:
+                self.flush()
+            except Exception:
+                traceback.print_exc()
+            if self.pending:
+                time.sleep(0.5)
@@ -0,0 +1,125 @@
+# embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB", "cache/embeddings.db")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+
+
+def embedding_key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk map of embedding_key(model, text) -> float32 vector (SQLite)."""
+
+    def __init__(self, path=EMBEDDING_CACHE_DB):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            conn = self._connect()
+            # stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(part))})", part)
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items):
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embedder so embed_documents only sends texts missing from the cache,
+    in batches, and serves the rest from disk. Queries are passed through."""
+
+    def __init__(self, embedder, model, cache=None, batch_size=EMBEDDING_BATCH_SIZE):
+        self.embedder = embedder
+        self.model = model
+        self.cache = cache or EmbeddingCache()
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        keys = [embedding_key(self.model, t) for t in texts]
+        vectors = self.cache.get_many(set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - sum(1 for k in keys if k in missing)
+        self.misses += len(missing)
+
+        missing = list(missing.items())
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            embedded = self.embedder.embed_documents([text for _, text in batch])
+            items = [(key, vector) for (key, _), vector in zip(batch, embedded)]
+            self.cache.put_many(items)
+            vectors.update(items)
+
+        return [list(vectors[key]) for key in keys]
+
+    def embed_query(self, text):
+        return self.embedder.embed_query(text)
+
+    def stats(self):
+        return {"model": self.model, "hits": self.hits, "misses": self.misses}
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic local embedder (hashed bag of words, L2-normalized) for running
+    and testing without network access. Not semantically meaningful."""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.sha256(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
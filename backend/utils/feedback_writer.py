@@ -0,0 +1,82 @@
+# feedback_writer.py
+import os
+
+from db import database
+from utils.buffered_writer import BufferedWriter
+
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", 100))
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("FEEDBACK_FLUSH_INTERVAL", 1.0))
+FEEDBACK_BUFFER_MAX = int(os.getenv("FEEDBACK_BUFFER_MAX", 10000))
+FEEDBACK_COLUMNS = ("message_id", "feedback_type", "comment")
+
+
+class FeedbackBufferFull(RuntimeError):
+    pass
+
+
+class FeedbackWriter(BufferedWriter):
+    """
+    Write-behind buffer for feedback rows. submit() only appends to memory; a flusher
+    thread writes the buffer in multi-row inserts of up to batch_size rows, as soon as
+    batch_size rows are waiting or every flush_interval seconds. Rows of a failed
+    write stay buffered and are retried (with backoff) on a fresh connection.
+    """
+    thread_name = "feedback-writer"
+
+    def __init__(self, database, batch_size=FEEDBACK_BATCH_SIZE, flush_interval=FEEDBACK_FLUSH_INTERVAL,
+                 max_buffered=FEEDBACK_BUFFER_MAX, table="feedbacks", columns=FEEDBACK_COLUMNS):
+        super().__init__(batch_size, flush_interval, max_buffered)
+        self.database = database
+        self.table = table
+        self.columns = columns
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def submit(self, *row):
+        self.start()
+        with self._cond:
+            if len(self._buffer) >= self.max_buffered:
+                self.rejected += 1
+                raise FeedbackBufferFull(f"Feedback buffer is full ({self.max_buffered} rows)")
+            self._buffer.append(row)
+            self.submitted += 1
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self):
+        """Writes everything buffered; raises (keeping the rows) if the database fails."""
+        with self._write_lock:
+            while True:
+                with self._cond:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    return
+                try:
+                    self.database.insert_many(self.table, self.columns, batch)
+                except Exception as e:
+                    with self._cond:
+                        self._buffer.extendleft(reversed(batch))
+                    self.failures += 1
+                    self.last_error = repr(e)
+                    raise
+                self.written += len(batch)
+                self.batches += 1
+
+    def stats(self):
+        return {
+            "buffered": len(self._buffer),
+            "submitted": self.submitted,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "reconnects": self.database.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+feedback_writer = FeedbackWriter(database)
@@ -0,0 +1,110 @@
+# index_manager.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics import record
+
+EMBEDDING_MODEL = "models/embedding-001"
+# "google" or "local" (deterministic HashEmbeddings, no network)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "google")
+INDEX_CACHE_MAX_BYTES = int(os.getenv("INDEX_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+def estimate_index_bytes(store):
+    # vectors (float32) plus the stored chunk texts
+    index = store.index
+    size = index.ntotal * index.d * 4
+    for doc in getattr(store.docstore, "_dict", {}).values():
+        size += len(doc.page_content)
+    return size
+
+
+class IndexManager:
+    """Keeps loaded FAISS vector stores in memory, least recently used first out once
+    their estimated size exceeds max_bytes, and shares one embeddings client whose
+    document embeddings go through the on-disk embedding cache."""
+
+    def __init__(self, max_bytes=INDEX_CACHE_MAX_BYTES, embedding_model=EMBEDDING_MODEL):
+        self.max_bytes = max_bytes
+        self.embedding_model = embedding_model
+        self._embeddings = None
+        self._stores = OrderedDict()  # index name -> (store, size)
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.last_load_seconds = 0.0
+
+    def embeddings(self):
+        if self._embeddings is None:
+            # imported here: LangChain and the Gemini client are slow to import
+            from utils.embedding_cache import CachedEmbeddings, HashEmbeddings
+            if EMBEDDING_BACKEND == "local":
+                embedder = HashEmbeddings()
+                model = f"local-hash-{embedder.dim}"
+            else:
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                embedder = GoogleGenerativeAIEmbeddings(model=self.embedding_model)
+                model = self.embedding_model
+            self._embeddings = CachedEmbeddings(embedder, model)
+        return self._embeddings
+
+    def get(self, index_name):
+        with self._lock:
+            cached = self._stores.get(index_name)
+            if cached is not None:
+                self._stores.move_to_end(index_name)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+            from langchain_community.vectorstores import FAISS
+            start = time.perf_counter()
+            store = FAISS.load_local(index_name, self.embeddings(), allow_dangerous_deserialization=True)
+            self.last_load_seconds = time.perf_counter() - start
+            record("faiss_load", self.last_load_seconds)
+            self.load_seconds += self.last_load_seconds
+            self.loads += 1
+
+            self.put(index_name, store)
+            return store
+
+    def put(self, index_name, store):
+        with self._lock:
+            self.evict(index_name)
+            size = estimate_index_bytes(store)
+            self._stores[index_name] = (store, size)
+            self.bytes += size
+            # always keep the most recent store, even if it alone is over budget
+            while self.bytes > self.max_bytes and len(self._stores) > 1:
+                oldest = next(iter(self._stores))
+                self.evict(oldest)
+                self.evictions += 1
+
+    def evict(self, index_name):
+        with self._lock:
+            cached = self._stores.pop(index_name, None)
+            if cached is not None:
+                self.bytes -= cached[1]
+
+    def stats(self):
+        return {
+            "cached_indexes": len(self._stores),
+            "cached_bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "loads": self.loads,
+            "avg_load_ms": round(self.load_seconds / self.loads * 1000, 3) if self.loads else 0.0,
+            "last_load_ms": round(self.last_load_seconds * 1000, 3),
+            "embedding_cache": self._embeddings.stats() if self._embeddings is not None else None,
+        }
+
+
+index_manager = IndexManager()
@@ -0,0 +1,160 @@
+# index_registry.py
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+INDEX_DIR = os.getenv("INDEX_DIR", "indexes")
+INDEX_MAX_AGE_SECONDS = int(os.getenv("INDEX_MAX_AGE_SECONDS", 7 * 24 * 3600))
+INDEX_DISK_BUDGET_BYTES = int(os.getenv("INDEX_DISK_BUDGET_BYTES", 2 * 1024 ** 3))
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class IndexRegistry:
+    """Maps document IDs to their FAISS index directories and the session that
+    uploaded them. Persisted as INDEX_DIR/registry.json; indexes not used for
+    max_age seconds, or beyond the disk budget (least recently used first), are
+    deleted by collect_garbage()."""
+
+    def __init__(self, index_dir=INDEX_DIR, max_age=INDEX_MAX_AGE_SECONDS, disk_budget=INDEX_DISK_BUDGET_BYTES):
+        self.index_dir = index_dir
+        self.max_age = max_age
+        self.disk_budget = disk_budget
+        self.registry_file = os.path.join(index_dir, "registry.json")
+        self._lock = threading.RLock()
+        self.documents = {}
+        if os.path.exists(self.registry_file):
+            with open(self.registry_file, "r", encoding="utf-8") as f:
+                self.documents = json.load(f)
+        # ingestion jobs do not survive a restart, so their documents never become ready
+        for document_id, document in list(self.documents.items()):
+            if document.get("status") == "pending":
+                self.remove(document_id)
+
+    def _save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = self.registry_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.documents, f)
+        os.replace(tmp_path, self.registry_file)
+
+    def new_document(self, session_id=None, filename=None):
+        """Reserves a document ID and index path; call register() once the index is saved."""
+        document_id = uuid.uuid4().hex
+        return {
+            "document_id": document_id,
+            "session_id": session_id or uuid.uuid4().hex,
+            "filename": filename,
+            "index_path": os.path.join(self.index_dir, f"faiss_index_{document_id}"),
+        }
+
+    def register(self, document, ready=True):
+        """Adds a document; with ready=False it is listed but not searchable until mark_ready()."""
+        now = time.time()
+        with self._lock:
+            self.documents[document["document_id"]] = dict(
+                document,
+                status="ready" if ready else "pending",
+                created_at=now,
+                last_used=now,
+                size_bytes=dir_size(document["index_path"]) if ready else 0,
+            )
+            self._save()
+        return self.documents[document["document_id"]]
+
+    def mark_ready(self, document_id):
+        with self._lock:
+            document = self.documents[document_id]
+            document["status"] = "ready"
+            document["last_used"] = time.time()
+            document["size_bytes"] = dir_size(document["index_path"])
+            self._save()
+        return document
+
+    def get(self, document_id):
+        return self.documents.get(document_id)
+
+    def touch(self, document_id):
+        with self._lock:
+            if document_id in self.documents:
+                self.documents[document_id]["last_used"] = time.time()
+
+    def resolve(self, session_id=None, document_ids=None):
+        """
+        Documents a question should search: the given IDs, else the latest ready upload
+        of the session. Without a session nothing is resolved, and IDs of another
+        session's documents are treated as unknown, so one client never searches (or
+        learns of) another's uploads.
+        Explicit IDs are returned whatever their status; callers check "status".
+        :raises KeyError: for an unknown document ID or one of another session
+        """
+        if document_ids:
+            missing = [d for d in document_ids
+                       if d not in self.documents or session_id is None
+                       or self.documents[d]["session_id"] != session_id]
+            if missing:
+                raise KeyError(f"Unknown document(s): {', '.join(missing)}")
+            return [self.documents[d] for d in document_ids]
+
+        if session_id is None:
+            return []
+        candidates = [d for d in self.documents.values()
+                      if d.get("status", "ready") == "ready" and d["session_id"] == session_id]
+        if not candidates:
+            return []
+        return [max(candidates, key=lambda d: d["created_at"])]
+
+    def session_documents(self, session_id):
+        return sorted((d for d in self.documents.values() if d["session_id"] == session_id),
+                      key=lambda d: d["created_at"])
+
+    def remove(self, document_id):
+        with self._lock:
+            document = self.documents.pop(document_id, None)
+            if document is not None:
+                shutil.rmtree(document["index_path"], ignore_errors=True)
+                self._save()
+            return document
+
+    def collect_garbage(self, keep=()):
+        """Deletes expired indexes, then least recently used ones until the total size
+        fits the disk budget, plus index directories the registry does not know about.
+        Documents in keep are never removed. Returns the removed documents."""
+        now = time.time()
+        removed = []
+        with self._lock:
+            keep = set(keep) | {d for d, doc in self.documents.items() if doc.get("status") == "pending"}
+            for document_id, document in list(self.documents.items()):
+                if document_id not in keep and now - document["last_used"] > self.max_age:
+                    removed.append(self.remove(document_id))
+
+            total = sum(d["size_bytes"] for d in self.documents.values())
+            for document in sorted(self.documents.values(), key=lambda d: d["last_used"]):
+                if total <= self.disk_budget:
+                    break
+                if document["document_id"] in keep:
+                    continue
+                removed.append(self.remove(document["document_id"]))
+                total -= document["size_bytes"]
+
+            if os.path.isdir(self.index_dir):
+                known = {os.path.basename(d["index_path"]) for d in self.documents.values()}
+                for name in os.listdir(self.index_dir):
+                    path = os.path.join(self.index_dir, name)
+                    # orphans (e.g. an upload that failed after saving) once they are past max age
+                    if (name.startswith("faiss_index_") and name not in known and os.path.isdir(path)
+                            and now - os.path.getmtime(path) > self.max_age):
+                        shutil.rmtree(path, ignore_errors=True)
+        return removed
+
+
+index_registry = IndexRegistry()
@@ -0,0 +1,146 @@
+# jobs.py
+import asyncio
+import os
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 2))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 20))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", 1000))
+
+
+class Job:
+    def __init__(self, kind, **info):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.info = info
+        self.status = "queued"  # queued -> running -> done | failed
+        self.stage = "queued"
+        self.pages_total = None
+        self.pages_done = 0
+        self.chunks_done = 0
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stage_seconds = {}
+        self._stage_started = None
+
+    def update(self, stage=None, **progress):
+        # progress callback for the pipeline: stage changes are timed
+        if stage is not None and stage != self.stage:
+            now = time.time()
+            if self._stage_started is not None:
+                self.stage_seconds[self.stage] = round(now - self._stage_started, 3)
+            self.stage = stage
+            self._stage_started = now
+        for key, value in progress.items():
+            setattr(self, key, value)
+
+    def fail(self, error):
+        self.status = "failed"
+        self.error = error
+        self.update(stage="failed")
+        self.finished_at = time.time()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            **self.info,
+            "status": self.status,
+            "stage": self.stage,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "chunks_done": self.chunks_done,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_seconds": round((self.started_at or time.time()) - self.created_at, 3),
+            "stage_seconds": self.stage_seconds,
+        }
+
+
+class JobQueue:
+    """Runs submitted coroutines on a fixed number of worker tasks. At most max_queued
+    jobs wait; submit() raises asyncio.QueueFull beyond that. stop() fails the jobs
+    that are still running or queued."""
+
+    def __init__(self, workers=INGEST_WORKERS, max_queued=INGEST_QUEUE_SIZE, history=JOB_HISTORY):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.history = history
+        self.jobs = OrderedDict()
+        self._queue = None
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # jobs that never started: their discard callback releases what they were given
+        while self._queue is not None and not self._queue.empty():
+            job, _, discard = self._queue.get_nowait()
+            job.fail("Server shut down before the job ran.")
+            if discard is not None:
+                try:
+                    discard(job)
+                except Exception:
+                    traceback.print_exc()
+
+    def submit(self, kind, run, discard=None, **info):
+        """
+        :param run: async callable(job) returning the job result (a dict)
+        :param discard: callable(job) called instead of run when the queue stops before
+            the job starts, e.g. to delete its input files
+        """
+        self.start()
+        job = Job(kind, **info)
+        self._queue.put_nowait((job, run, discard))
+        self.jobs[job.id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        # forget the oldest finished jobs beyond the history size
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.history:
+                break
+            if self.jobs[job_id].finished_at is not None:
+                del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job, run, _ = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await run(job)
+                job.status = "done"
+                job.update(stage="done")
+                job.finished_at = time.time()
+            except asyncio.CancelledError:
+                job.fail("Server shut down while the job ran.")
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                job.fail(str(e))
+            finally:
+                self._queue.task_done()
+
+
+ingestion_queue = JobQueue()
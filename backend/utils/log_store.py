@@ -0,0 +1,605 @@
+# log_store.py
+"""Indexed store for the interaction log.
+
+Rows are only ever appended. Indexes on timestamp, normalized question and every
+metric column let /analysis read just the rows it returns instead of scanning
+logs/qa_log.jsonl. Votes from /feedback are attached to their interaction by
+message ID; a vote arriving before its interaction is written (it may still be
+buffered by another worker's log writer) waits in pending_votes and is applied by
+the append that brings the interaction. The rollups table keeps per question / day / model counts, votes
+and metric sums up to date as rows and votes arrive. The metric_bins table holds
+the hourly and daily metric histograms of utils/timeseries.py, also updated on
+append. Import an existing log with (entries already stored are skipped, so it
+can be run again, e.g. after the store missed a batch):
+    python -m utils.log_store import logs/qa_log.jsonl
+"""
+import argparse
+import base64
+import binascii
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.timeseries import GRANULARITIES, SERIES_DIMENSIONS, bin_index, bin_sql, bucket_bounds, series_keys, summarize
+
+LOG_DB = "logs/qa_log.db"
+# how long a vote waits for its interaction (answers without a reference are never logged)
+PENDING_VOTE_SECONDS = float(os.getenv("PENDING_VOTE_SECONDS", 3600))
+METRICS = ["Bleu_1", "Bleu_2", "Bleu_3", "Bleu_4", "ROUGE_L"]
+ROLLUP_DIMENSIONS = ["question", "day", "model"]
+VOTES = ("up", "down")
+
+
+def normalize_question(question):
+    return question.lower()
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+def _time_filter(since, until):
+    clauses, params = [], []
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    return clauses, params
+
+
+class LogStore:
+    def __init__(self, path=LOG_DB):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # WAL lets readers run alongside the (single) writer of each uvicorn worker
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            metric_cols = ", ".join(f"{m} REAL" for m in METRICS)
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS interactions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    question_norm TEXT NOT NULL,
+                    answer TEXT,
+                    {metric_cols},
+                    message_id INTEGER,
+                    model TEXT,
+                    feedback TEXT,
+                    reference TEXT
+                )""")
+            # logs created before message IDs existed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(interactions)")}
+            for column, decl in (("message_id", "INTEGER"), ("model", "TEXT"), ("feedback", "TEXT"),
+                                 ("reference", "TEXT")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE interactions ADD COLUMN {column} {decl}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_interactions_timestamp ON interactions(timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_interactions_question ON interactions(question_norm, timestamp)")
+            # one row per message ID, so a vote always lands on exactly one interaction
+            indexes = {row["name"]: row["unique"] for row in conn.execute("PRAGMA index_list(interactions)")}
+            replays_dropped = False
+            if not indexes.get("idx_interactions_message"):
+                if "idx_interactions_message" in indexes:
+                    conn.execute("DROP INDEX idx_interactions_message")
+                replays_dropped = self._dedupe_message_ids(conn)
+                conn.execute("CREATE UNIQUE INDEX idx_interactions_message ON interactions(message_id)")
+            for m in METRICS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_interactions_{m} ON interactions({m})")
+                # only downvoted rows, so appends (feedback still NULL) do not pay for it
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_interactions_down_{m} ON interactions({m}) WHERE feedback = 'down'")
+
+            rollup_cols = ", ".join(f"sum_{m} REAL NOT NULL DEFAULT 0, n_{m} INTEGER NOT NULL DEFAULT 0" for m in METRICS)
+            new_rollups = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'").fetchone() is None
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS rollups (
+                    dimension TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    interactions INTEGER NOT NULL DEFAULT 0,
+                    up INTEGER NOT NULL DEFAULT 0,
+                    down INTEGER NOT NULL DEFAULT 0,
+                    {rollup_cols},
+                    PRIMARY KEY (dimension, value)
+                )""")
+            if new_rollups or replays_dropped:
+                self._rebuild_rollups(conn)
+
+            new_series = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metric_bins'").fetchone() is None
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metric_bins (
+                    granularity TEXT NOT NULL,
+                    dimension TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    bin INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    sum REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (granularity, dimension, metric, bucket, value, bin)
+                ) WITHOUT ROWID""")
+            if new_series or replays_dropped:
+                self._rebuild_series(conn)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_votes (
+                    message_id INTEGER PRIMARY KEY,
+                    feedback TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_votes_created ON pending_votes(created_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _dedupe_message_ids(conn):
+        # stores from before message IDs were unique: a row repeating an earlier row's ID
+        # and content is the same interaction imported twice and is deleted; any other
+        # repeat is a colliding ID and is cleared, votes staying with the first row.
+        # Returns whether rows were deleted (the rollups then need a rebuild).
+        repeats = conn.execute("""
+            SELECT i.id, i.timestamp = f.timestamp AND i.question = f.question AND i.answer IS f.answer AS replay
+            FROM (SELECT message_id, MIN(id) AS first_id FROM interactions
+                  WHERE message_id IS NOT NULL GROUP BY message_id HAVING COUNT(*) > 1) d
+            JOIN interactions i ON i.message_id = d.message_id AND i.id > d.first_id
+            JOIN interactions f ON f.id = d.first_id""").fetchall()
+        conn.executemany("DELETE FROM interactions WHERE id = ?", [(r["id"],) for r in repeats if r["replay"]])
+        conn.executemany("UPDATE interactions SET message_id = NULL WHERE id = ?",
+                         [(r["id"],) for r in repeats if not r["replay"]])
+        return any(r["replay"] for r in repeats)
+
+    @staticmethod
+    def _rebuild_rollups(conn):
+        # recomputes every rollup from the interactions (stores created before rollups existed)
+        conn.execute("DELETE FROM rollups")
+        value_exprs = {"question": "question_norm", "day": "substr(timestamp, 1, 10)", "model": "COALESCE(model, 'unknown')"}
+        sums = ", ".join(f"COALESCE(SUM({m}), 0), COUNT({m})" for m in METRICS)
+        cols = ", ".join(f"sum_{m}, n_{m}" for m in METRICS)
+        for dimension in ROLLUP_DIMENSIONS:
+            expr = value_exprs[dimension]
+            conn.execute(f"""
+                INSERT INTO rollups (dimension, value, interactions, up, down, {cols})
+                SELECT ?, {expr}, COUNT(*), SUM(feedback IS 'up'), SUM(feedback IS 'down'), {sums}
+                FROM interactions GROUP BY {expr}""", (dimension,))
+
+    @staticmethod
+    def _rebuild_series(conn):
+        # recomputes every metric histogram from the interactions
+        conn.execute("DELETE FROM metric_bins")
+        value_exprs = {"all": "'*'", "reference": "COALESCE(reference, 'none')", "model": "COALESCE(model, 'unknown')"}
+        for granularity, length in GRANULARITIES.items():
+            for dimension in SERIES_DIMENSIONS:
+                for m in METRICS:
+                    conn.execute(f"""
+                        INSERT INTO metric_bins (granularity, dimension, metric, bucket, value, bin, count, sum)
+                        SELECT ?, ?, ?, substr(timestamp, 1, {length}), {value_exprs[dimension]}, {bin_sql(m)},
+                               COUNT(*), SUM({m})
+                        FROM interactions WHERE {m} IS NOT NULL GROUP BY 4, 5, 6""", (granularity, dimension, m))
+
+    def rebuild_rollups(self):
+        """Recomputes the rollups and the metric histograms from the stored interactions."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._rebuild_rollups(conn)
+                self._rebuild_series(conn)
+
+    @staticmethod
+    def _check_metric(metric_name):
+        if metric_name not in METRICS:
+            raise ValueError(f"Unknown metric: {metric_name}")
+
+    @staticmethod
+    def _check_dimension(dimension, dimensions=ROLLUP_DIMENSIONS):
+        if dimension not in dimensions:
+            raise ValueError(f"Unknown dimension: {dimension}")
+
+    @staticmethod
+    def _to_row(entry):
+        metrics = entry.get("metrics") or {}
+        return (entry["timestamp"], entry["question"], normalize_question(entry["question"]),
+                entry.get("answer"), *[metrics.get(m) for m in METRICS], entry.get("message_id"), entry.get("model"),
+                entry.get("reference"))
+
+    @staticmethod
+    def _to_entry(row, metrics=METRICS):
+        # same shape as a qa_log.jsonl line, restricted to the requested metrics
+        entry = {
+            "timestamp": row["timestamp"],
+            "question": row["question"],
+            "answer": row["answer"],
+            "metrics": {m: row[m] for m in metrics if row[m] is not None},
+        }
+        for key in ("message_id", "model", "feedback", "reference"):
+            if row[key] is not None:
+                entry[key] = row[key]
+        return entry
+
+    @staticmethod
+    def _rollup_keys(question_norm, timestamp, model):
+        return list(zip(ROLLUP_DIMENSIONS, (question_norm, timestamp[:10], model or "unknown")))
+
+    @staticmethod
+    def _in_chunks(conn, sql, values, size=500):
+        # sql has one "{}" for the placeholders of an IN list of at most size values
+        for i in range(0, len(values), size):
+            chunk = values[i:i + size]
+            yield from conn.execute(sql.format(", ".join("?" * len(chunk))), chunk)
+
+    @classmethod
+    def _new_rows(cls, conn, rows):
+        # Drops rows already stored, so a log imported again (or a batch retried) is not
+        # counted twice: same timestamp, question, answer and message ID, or no stored ID
+        # (legacy entries, cleared collisions). A new row whose message ID is taken is a
+        # collision of random IDs and is kept without an ID, the vote going to the first.
+        at = 4 + len(METRICS)
+        stored = {tuple(r) for r in cls._in_chunks(
+            conn, "SELECT timestamp, question, answer, message_id FROM interactions WHERE timestamp IN ({})",
+            list({row[0] for row in rows}))}
+        taken = {r[0] for r in cls._in_chunks(
+            conn, "SELECT message_id FROM interactions WHERE message_id IN ({})",
+            list({row[at] for row in rows if row[at] is not None}))}
+        new = []
+        for row in rows:
+            content = (row[0], row[1], row[3])
+            if (*content, row[at]) in stored or (*content, None) in stored:
+                continue
+            if row[at] is not None:
+                if row[at] in taken:
+                    row = row[:at] + (None,) + row[at + 1:]
+                else:
+                    taken.add(row[at])
+            stored.add((*content, row[at]))
+            new.append(row)
+        return new
+
+    @classmethod
+    def _deltas(cls, rows):
+        # one upsert per (dimension, value) touched by the batch
+        deltas = {}
+        bins = {}
+        for row in rows:
+            values = row[4:4 + len(METRICS)]
+            for key in cls._rollup_keys(row[2], row[0], row[-2]):
+                delta = deltas.setdefault(key, [0] + [0.0, 0] * len(METRICS))
+                delta[0] += 1
+                for i, value in enumerate(values):
+                    if value is not None:
+                        delta[1 + 2 * i] += value
+                        delta[2 + 2 * i] += 1
+            # and one per histogram bin
+            for granularity, bucket, dimension, value in series_keys(row[0], row[-1], row[-2]):
+                for m, score in zip(METRICS, values):
+                    if score is not None:
+                        delta = bins.setdefault((granularity, dimension, m, bucket, value, bin_index(score)), [0, 0.0])
+                        delta[0] += 1
+                        delta[1] += score
+        return deltas, bins
+
+    def append_many(self, entries):
+        """Stores the entries not stored yet; returns how many were new."""
+        cols = ", ".join(["timestamp", "question", "question_norm", "answer"] + METRICS + ["message_id", "model", "reference"])
+        marks = ", ".join("?" * (7 + len(METRICS)))
+        rows = [self._to_row(e) for e in entries]
+        rollup_cols = ["interactions"] + [c for m in METRICS for c in (f"sum_{m}", f"n_{m}")]
+        upsert = (
+            f"INSERT INTO rollups (dimension, value, {', '.join(rollup_cols)}) "
+            f"VALUES ({', '.join('?' * (2 + len(rollup_cols)))}) "
+            f"ON CONFLICT(dimension, value) DO UPDATE SET "
+            + ", ".join(f"{c} = {c} + excluded.{c}" for c in rollup_cols)
+        )
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # IMMEDIATE: no other worker can store the rows between the lookup and the insert
+                conn.execute("BEGIN IMMEDIATE")
+                rows = self._new_rows(conn, rows)
+                deltas, bins = self._deltas(rows)
+                conn.executemany(f"INSERT INTO interactions ({cols}) VALUES ({marks})", rows)
+                conn.executemany(upsert, [(*key, *delta) for key, delta in deltas.items()])
+                conn.executemany(
+                    "INSERT INTO metric_bins (granularity, dimension, metric, bucket, value, bin, count, sum) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(granularity, dimension, metric, bucket, value, bin) DO UPDATE SET "
+                    "count = count + excluded.count, sum = sum + excluded.sum",
+                    [(*key, *delta) for key, delta in bins.items()])
+                self._apply_pending_votes(conn, rows)
+        return len(rows)
+
+    @classmethod
+    def _apply_pending_votes(cls, conn, rows):
+        # votes that reached record_feedback before these rows were appended
+        at = 4 + len(METRICS)
+        by_id = {row[at]: row for row in rows if row[at] is not None}
+        votes = list(cls._in_chunks(conn, "SELECT message_id, feedback FROM pending_votes WHERE message_id IN ({})",
+                                    list(by_id)))
+        if not votes:
+            return
+        conn.executemany("UPDATE interactions SET feedback = ? WHERE message_id = ?",
+                         [(feedback, message_id) for message_id, feedback in votes])
+        conn.executemany(
+            "UPDATE rollups SET up = up + ?, down = down + ? WHERE dimension = ? AND value = ?",
+            [(feedback == "up", feedback == "down", *key) for message_id, feedback in votes
+             for key in cls._rollup_keys(by_id[message_id][2], by_id[message_id][0], by_id[message_id][-2])])
+        conn.executemany("DELETE FROM pending_votes WHERE message_id = ?", [(message_id,) for message_id, _ in votes])
+
+    def record_feedback(self, message_id, feedback_type):
+        """
+        Attaches an up/down vote to the interaction with message_id and moves the vote
+        counts of its rollups (a changed vote is moved, not counted twice). A vote for an
+        interaction not stored yet is kept for PENDING_VOTE_SECONDS and attached when
+        append_many() stores it.
+        :returns: False when no interaction has that message ID (yet)
+        """
+        if feedback_type not in VOTES:
+            return False
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # IMMEDIATE: the interaction cannot be appended between the lookup and the pending vote
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT id, question_norm, timestamp, model, feedback FROM interactions WHERE message_id = ?",
+                    (message_id,)).fetchone()
+                if row is None:
+                    now = time.time()
+                    conn.execute("DELETE FROM pending_votes WHERE created_at < ?", (now - PENDING_VOTE_SECONDS,))
+                    conn.execute(
+                        "INSERT INTO pending_votes (message_id, feedback, created_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(message_id) DO UPDATE SET feedback = excluded.feedback",
+                        (message_id, feedback_type, now))
+                    return False
+                previous = row["feedback"]
+                if previous == feedback_type:
+                    return True
+                conn.execute("UPDATE interactions SET feedback = ? WHERE id = ?", (feedback_type, row["id"]))
+                up = (feedback_type == "up") - (previous == "up")
+                down = (feedback_type == "down") - (previous == "down")
+                conn.executemany(
+                    "UPDATE rollups SET up = up + ?, down = down + ? WHERE dimension = ? AND value = ?",
+                    [(up, down, *key) for key in self._rollup_keys(row["question_norm"], row["timestamp"], row["model"])])
+        return True
+
+    def votes(self, message_ids):
+        """{message_id: "up" | "down"} of the voted interactions among message_ids."""
+        if not message_ids:
+            return {}
+        rows = self._query(
+            f"SELECT message_id, feedback FROM interactions "
+            f"WHERE feedback IS NOT NULL AND message_id IN ({', '.join('?' * len(message_ids))})", list(message_ids))
+        return {r["message_id"]: r["feedback"] for r in rows}
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _page(self, where, params, order, limit, cursor_of, metrics):
+        for m in metrics:
+            self._check_metric(m)
+        # fetches one extra row to know whether there is a next page
+        rows = self._query(
+            f"SELECT * FROM interactions WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?",
+            (*params, limit + 1))
+        next_cursor = encode_cursor(cursor_of(rows[limit - 1])) if len(rows) > limit else None
+        return [self._to_entry(r, metrics) for r in rows[:limit]], next_cursor
+
+    def top(self, metric_name="ROUGE_L", limit=10, cursor=None, since=None, until=None, metrics=METRICS):
+        """Highest scores first. Returns (entries, next_cursor); keyset pagination on the
+        metric index, so each page costs O(limit) however large the log is."""
+        self._check_metric(metric_name)
+        where, params = _time_filter(since, until)
+        where.append(f"{metric_name} IS NOT NULL")
+        if cursor:
+            score, last_id = decode_cursor(cursor)
+            where.append(f"({metric_name} < ? OR ({metric_name} = ? AND id > ?))")
+            params += [score, score, last_id]
+        return self._page(where, params, f"{metric_name} DESC, id ASC", limit,
+                          lambda r: [r[metric_name], r["id"]], metrics)
+
+    def below(self, metric_name="ROUGE_L", threshold=0.5, limit=50, cursor=None, since=None, until=None,
+              metrics=METRICS):
+        """Entries scoring under threshold in log order. Returns (entries, next_cursor)."""
+        self._check_metric(metric_name)
+        where, params = _time_filter(since, until)
+        where.append(f"{metric_name} < ?")
+        params.append(threshold)
+        if cursor:
+            where.append("id > ?")
+            params.append(decode_cursor(cursor)[0])
+        return self._page(where, params, "id ASC", limit, lambda r: [r["id"]], metrics)
+
+    def downvoted(self, metric_name="ROUGE_L", threshold=0.5, limit=50, cursor=None, since=None, until=None,
+                  metrics=METRICS):
+        """Downvoted entries scoring under threshold, lowest score first. Returns
+        (entries, next_cursor); served from the partial index of downvoted rows."""
+        self._check_metric(metric_name)
+        where, params = _time_filter(since, until)
+        where += ["feedback = 'down'", f"{metric_name} < ?"]
+        params.append(threshold)
+        if cursor:
+            score, last_id = decode_cursor(cursor)
+            where.append(f"({metric_name} > ? OR ({metric_name} = ? AND id > ?))")
+            params += [score, score, last_id]
+        return self._page(where, params, f"{metric_name} ASC, id ASC", limit,
+                          lambda r: [r[metric_name], r["id"]], metrics)
+
+    def rollups(self, dimension="question", limit=50, cursor=None, metrics=METRICS):
+        """
+        Per-value totals for a dimension (question, day or model), ordered by value:
+        interactions, up/down votes, downvote rate and mean of each metric.
+        Returns (rows, next_cursor).
+        """
+        self._check_dimension(dimension)
+        for m in metrics:
+            self._check_metric(m)
+        where, params = ["dimension = ?"], [dimension]
+        if cursor:
+            where.append("value > ?")
+            params.append(decode_cursor(cursor)[0])
+        rows = self._query(
+            f"SELECT * FROM rollups WHERE {' AND '.join(where)} ORDER BY value LIMIT ?", (*params, limit + 1))
+        next_cursor = encode_cursor([rows[limit - 1]["value"]]) if len(rows) > limit else None
+        return [{
+            dimension: r["value"],
+            "interactions": r["interactions"],
+            "up": r["up"],
+            "down": r["down"],
+            "downvote_rate": round(r["down"] / r["interactions"], 4) if r["interactions"] else 0.0,
+            "metrics": {m: r[f"sum_{m}"] / r[f"n_{m}"] for m in metrics if r[f"n_{m}"]},
+        } for r in rows[:limit]], next_cursor
+
+    def series(self, metric_name="ROUGE_L", granularity="day", dimension="all", value=None, limit=100,
+               cursor=None, since=None, until=None):
+        """
+        Count, mean and p10/p50/p90 of a metric per hour or day bucket, over all answers
+        or per reference / model (only `value` if given), ordered by bucket then value.
+        Buckets are whole: every bucket overlapping [since, until) is included. Returns (points, next_cursor).
+        """
+        self._check_metric(metric_name)
+        self._check_dimension(dimension, SERIES_DIMENSIONS)
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        where = ["granularity = ?", "dimension = ?", "metric = ?"]
+        params = [granularity, dimension, metric_name]
+        if value is not None:
+            where.append("value = ?")
+            params.append(value)
+        first, end = bucket_bounds(since, until, GRANULARITIES[granularity])
+        if first:
+            where.append("bucket >= ?")
+            params.append(first)
+        if end:
+            where.append("bucket < ?")
+            params.append(end)
+        if cursor:
+            where.append("(bucket, value) > (?, ?)")
+            params += decode_cursor(cursor)
+        where = " AND ".join(where)
+
+        # the page of (bucket, value) points first, then all of their bins
+        keys = self._query(
+            f"SELECT DISTINCT bucket, value FROM metric_bins WHERE {where} ORDER BY bucket, value LIMIT ?",
+            (*params, limit + 1))
+        next_cursor = encode_cursor(list(keys[limit - 1])) if len(keys) > limit else None
+        keys = keys[:limit]
+        if not keys:
+            return [], None
+        rows = self._query(
+            f"SELECT bucket, value, bin, count, sum FROM metric_bins WHERE {where} "
+            f"AND (bucket, value) <= (?, ?) ORDER BY bucket, value, bin", (*params, *keys[-1]))
+
+        histograms = {}
+        for row in rows:
+            counts, sums = histograms.setdefault((row["bucket"], row["value"]), ({}, []))
+            counts[row["bin"]] = row["count"]
+            sums.append(row["sum"])
+        points = []
+        for (bucket, point_value), (counts, sums) in histograms.items():
+            point = {granularity: bucket}
+            if dimension != "all":
+                point[dimension] = point_value
+            points.append({**point, **summarize(counts, sum(sums))})
+        return points, next_cursor
+
+    def regressions(self, metric_name="ROUGE_L"):
+        # consecutive answers to the same (lowercased) question where the metric went down;
+        # a missing metric counts as 1 like in logger.detect_regressions
+        self._check_metric(metric_name)
+        rows = self._query(f"""
+            SELECT * FROM (
+                SELECT question_norm, timestamp, answer,
+                       COALESCE({metric_name}, 1) AS score,
+                       LAG(COALESCE({metric_name}, 1)) OVER w AS prev_score,
+                       LAG(timestamp) OVER w AS prev_timestamp,
+                       LAG(answer) OVER w AS prev_answer
+                FROM interactions
+                WINDOW w AS (PARTITION BY question_norm ORDER BY timestamp, id)
+            ) WHERE score < prev_score
+            ORDER BY question_norm, timestamp""")
+        return [{
+            "question": r["question_norm"],
+            "previous_score": r["prev_score"],
+            "current_score": r["score"],
+            "timestamp_prev": r["prev_timestamp"],
+            "timestamp_curr": r["timestamp"],
+            "answer_prev": r["prev_answer"],
+            "answer_curr": r["answer"],
+        } for r in rows]
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM interactions")[0][0]
+
+    def import_jsonl(self, path, batch_size=10000):
+        # rotated segments of the log first, then the file itself
+        from utils.log_writer import iter_log_lines
+
+        imported = 0
+        batch = []
+        for line in iter_log_lines(path):
+            if not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                imported += self.append_many(batch)
+                batch = []
+        if batch:
+            imported += self.append_many(batch)
+        return imported
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+log_store = LogStore()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interaction log store tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="append the entries of a JSONL log the store does not have yet")
+    imp.add_argument("jsonl", nargs="?", default="logs/qa_log.jsonl")
+    imp.add_argument("--db", default=LOG_DB)
+    rollups = sub.add_parser("rollups", help="recompute the per question / day / model rollups and metric series")
+    rollups.add_argument("--db", default=LOG_DB)
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        store = LogStore(args.db)
+        print(f"Imported {store.import_jsonl(args.jsonl)} new entries into {args.db}")
+        store.close()
+    elif args.command == "rollups":
+        store = LogStore(args.db)
+        store.rebuild_rollups()
+        print(f"Rebuilt rollups of {store.count()} entries in {args.db}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
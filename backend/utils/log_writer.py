@@ -0,0 +1,449 @@
+# log_writer.py
+"""Buffered, rotating writer for the interaction log (logs/qa_log.jsonl).
+
+write() only serializes the entry and appends it to memory. A flusher thread
+appends the buffered lines to the log in one write() per batch, holding an
+exclusive flock on logs/qa_log.jsonl.lock, so several uvicorn workers can log
+concurrently without interleaving or losing lines. Still under the lock, the
+batch is appended to the metric columns (utils/metric_columns.py), so they
+follow the log's order; then it is added to the indexed log store, where a batch
+that fails is kept and retried on the next flush. write() never does I/O: when
+the flusher falls LOG_BUFFER_MAX lines behind, new lines are dropped and counted. LOG_FSYNC
+sets when the file is fsynced: "batch" (after every batch), "interval" (at most
+every LOG_FSYNC_INTERVAL seconds) or "off".
+
+Once the log is LOG_ROTATE_BYTES long, or its first line is LOG_ROTATE_SECONDS
+old, it is renamed to a numbered segment (qa_log.000001.jsonl). The segment is
+then gzip-compressed outside the lock. logs/qa_log.manifest.json lists the
+segments in order, with the global number of their first line, their line count
+and their first/last timestamps. iter_log_lines() reads the segments and then
+the live file as one log.
+"""
+import atexit
+import gzip
+import json
+import os
+import shutil
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, fine for a single worker
+    fcntl = None
+
+from utils.buffered_writer import BufferedWriter
+from utils.log_store import log_store
+from utils.metric_columns import metric_columns
+
+LOG_FILE = "logs/qa_log.jsonl"
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 200))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 0.5))
+# above this many buffered lines, write() drops new lines (counted) instead of blocking the caller
+LOG_BUFFER_MAX = int(os.getenv("LOG_BUFFER_MAX", 10000))
+LOG_FSYNC = os.getenv("LOG_FSYNC", "interval")
+LOG_FSYNC_INTERVAL = float(os.getenv("LOG_FSYNC_INTERVAL", 1.0))
+LOG_ROTATE_BYTES = int(os.getenv("LOG_ROTATE_BYTES", 64 * 1024 * 1024))
+# 0: rotate on size only
+LOG_ROTATE_SECONDS = float(os.getenv("LOG_ROTATE_SECONDS", 0))
+# entries parsed per append when catching the metric columns up with the log
+COLUMNS_SYNC_BATCH = 10000
+FSYNC_POLICIES = ("batch", "interval", "off")
+
+
+def manifest_path(path):
+    return os.path.splitext(path)[0] + ".manifest.json"
+
+
+def read_manifest(path):
+    try:
+        with open(manifest_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"segments": []}
+
+
+def _write_manifest(path, manifest):
+    tmp_path = manifest_path(path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path(path))
+
+
+class _FileLock:
+    """Exclusive (or shared) flock on path + ".lock", held for the with block."""
+
+    def __init__(self, path, shared=False):
+        self.path = path + ".lock"
+        self.shared = shared
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        return False
+
+
+def open_segment(directory, segment):
+    """Opens a rotated segment for reading (bytes), compressed or not yet compressed."""
+    name = os.path.join(directory, segment["file"])
+    plain = name[:-3] if name.endswith(".gz") else name
+    for candidate in (name, plain + ".gz", plain):
+        try:
+            return gzip.open(candidate, "rb") if candidate.endswith(".gz") else open(candidate, "rb")
+        except FileNotFoundError:
+            continue
+    raise FileNotFoundError(f"Log segment {segment['file']} is missing")
+
+
+def log_snapshot(path=LOG_FILE):
+    """
+    The segments and an open handle on the live file, taken together under a shared
+    lock so that a concurrent rotation cannot drop or repeat lines between them.
+    :returns: (segments, live file opened in binary mode, or None)
+    """
+    if os.path.dirname(path) and not os.path.isdir(os.path.dirname(path)):
+        return [], None
+    with _FileLock(path, shared=True):
+        segments = read_manifest(path)["segments"]
+        try:
+            live = open(path, "rb")
+        except FileNotFoundError:
+            live = None
+    return segments, live
+
+
+def iter_log_lines(path=LOG_FILE, since=None, until=None):
+    """
+    Raw lines (bytes) of the whole log in order: rotated segments, then the live file.
+    Segments entirely outside [since, until) are skipped; lines are not filtered.
+    A partially written last line is left out.
+    """
+    segments, live = log_snapshot(path)
+    directory = os.path.dirname(path)
+    try:
+        for segment in segments:
+            if since and segment.get("last_timestamp") and segment["last_timestamp"] < since:
+                continue
+            if until and segment.get("first_timestamp") and segment["first_timestamp"] >= until:
+                continue
+            with open_segment(directory, segment) as f:
+                yield from f
+        if live is not None:
+            for line in live:
+                if line.endswith(b"\n"):
+                    yield line
+    finally:
+        if live is not None:
+            live.close()
+
+
+def _live_first_line(segments):
+    return segments[-1]["first_line"] + segments[-1]["lines"] if segments else 0
+
+
+def log_position_valid(segments, live, position):
+    """
+    Whether a read position is still in the log. A position is a dict with the global
+    number of the first line of the file being read ("base_line"), the byte offset
+    reached in it ("offset") and, once known, the global number of the next line ("line").
+    It is lost when segments were removed or the log was truncated or replaced.
+    """
+    base_line = position.get("base_line", 0)
+    live_first_line = _live_first_line(segments)
+    if base_line == live_first_line:
+        return position["offset"] == 0 or (live is not None and os.fstat(live.fileno()).st_size >= position["offset"])
+    return any(s["first_line"] == base_line for s in segments)
+
+
+def read_log_from(segments, live, position, directory):
+    """
+    Complete lines (bytes) of the log after position, from the segments and then the
+    live file of a log_snapshot(). position is advanced past each line as it is yielded.
+    """
+    base_line = position.setdefault("base_line", 0)
+    for segment in segments:
+        end = segment["first_line"] + segment["lines"]
+        if segment["first_line"] < base_line:
+            continue
+        # a position at the end of a segment (rotated since) skips it without decompressing
+        if position.get("line") != end:
+            with open_segment(directory, segment) as f:
+                yield from _read_lines(f, position)
+        position.update(base_line=end, offset=0, line=end)
+    if live is not None:
+        yield from _read_lines(live, position)
+
+
+def _read_lines(f, position):
+    f.seek(position["offset"])
+    for line in f:
+        if not line.endswith(b"\n"):
+            break  # partially written line, picked up next time
+        position["offset"] += len(line)
+        if "line" in position:
+            position["line"] += 1
+        yield line
+
+
+def _line_timestamp(line):
+    try:
+        return json.loads(line)["timestamp"]
+    except (ValueError, KeyError):
+        return None
+
+
+def _last_line(f, size):
+    f.seek(max(0, size - 65536))
+    lines = f.read().splitlines()
+    return lines[-1] if lines else b""
+
+
+class LogWriter(BufferedWriter):
+    thread_name = "log-writer"
+
+    def __init__(self, path=LOG_FILE, store=None, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+                 max_buffered=LOG_BUFFER_MAX, fsync=LOG_FSYNC, fsync_interval=LOG_FSYNC_INTERVAL,
+                 rotate_bytes=LOG_ROTATE_BYTES, rotate_seconds=LOG_ROTATE_SECONDS, columns=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"LOG_FSYNC must be one of {', '.join(FSYNC_POLICIES)}")
+        super().__init__(batch_size, flush_interval, max_buffered)
+        self.path = path
+        self.store = store
+        self.columns = columns
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self._last_fsync = 0.0
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+        self.failures = 0
+        self.dropped = 0
+        self.store_failures = 0
+        self.store_dropped = 0
+        self.last_error = None
+        self._store_backlog = deque()  # entries in the log but not yet in the store
+
+    @property
+    def pending(self):
+        return len(self._buffer) + len(self._store_backlog)
+
+    def write(self, entry):
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        self.start()
+        with self._cond:
+            if len(self._buffer) >= self.max_buffered:
+                # the flusher is falling behind (or the disk fails): the caller, often the
+                # event loop, must not wait for the write
+                self.dropped += 1
+                self._cond.notify()
+                return
+            self._buffer.append((entry, line))
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self):
+        """Writes everything buffered (as (entry, serialized line) pairs); raises (keeping the lines) if the file
+        cannot be written. Entries the store fails to take are kept for the next flush."""
+        with self._write_lock:
+            while True:
+                with self._cond:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                if not batch:
+                    break
+                try:
+                    self._append(b"".join(line for _, line in batch), [entry for entry, _ in batch])
+                except Exception as e:
+                    with self._cond:
+                        self._buffer.extendleft(reversed(batch))
+                    self.failures += 1
+                    self.last_error = repr(e)
+                    raise
+                self.written += len(batch)
+                self.batches += 1
+                if self.store is not None:
+                    self._store_backlog.extend(entry for entry, _ in batch)
+            self._flush_store()
+
+    def _flush_store(self):
+        # append_many skips entries it already has, so a batch whose commit raised is safe to resend.
+        # A failure does not raise: the flusher's backoff would hold back the log file too.
+        while self._store_backlog:
+            batch = [self._store_backlog[i] for i in range(min(self.batch_size, len(self._store_backlog)))]
+            try:
+                self.store.append_many(batch)
+            except Exception as e:
+                self.store_failures += 1
+                self.last_error = repr(e)
+                # bounded: the JSONL log keeps every line, `python -m utils.log_store import` catches up
+                while len(self._store_backlog) > self.max_buffered:
+                    self._store_backlog.popleft()
+                    self.store_dropped += 1
+                traceback.print_exc()
+                return
+            for _ in batch:
+                self._store_backlog.popleft()
+
+    def _append(self, data, entries):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        to_compress = None
+        with _FileLock(self.path):
+            if self._should_rotate():
+                to_compress = self._rotate()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                start = os.fstat(fd).st_size
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                now = time.monotonic()
+                if self.fsync == "batch" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+                    os.fsync(fd)
+                    self._last_fsync = now
+            finally:
+                os.close(fd)
+            if self.columns is not None:
+                self._append_columns(start, start + len(data), entries)
+        if to_compress:
+            self._compress(to_compress)
+
+    def _append_columns(self, start, end, entries):
+        # called with the file lock held, right after the batch was written at [start, end) of the
+        # live file, so rows are in log order whichever worker writes them
+        segments = read_manifest(self.path)["segments"]
+        try:
+            position = self.columns.position()
+            if (position["base_line"], position["offset"]) == (_live_first_line(segments), start):
+                self.columns.append_many(entries, {**position, "offset": end, "line": position["line"] + len(entries)})
+            else:
+                # columns missing lines (new, or an earlier append failed): read them from the log
+                self._sync_columns(segments)
+        except Exception as e:
+            # retried from the log on the next batch
+            self.last_error = repr(e)
+            traceback.print_exc()
+
+    def sync_columns(self):
+        """Catches the metric columns up with the log (building them if missing). Returns the rows added."""
+        if self.columns is None:
+            return 0
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with _FileLock(self.path):
+            return self._sync_columns(read_manifest(self.path)["segments"])
+
+    def _sync_columns(self, segments):
+        try:
+            live = open(self.path, "rb")
+        except FileNotFoundError:
+            live = None
+        try:
+            position = self.columns.position()
+            if not log_position_valid(segments, live, position):
+                self.columns.reset()
+                position = self.columns.position()
+            added, batch = 0, []
+            for line in read_log_from(segments, live, position, os.path.dirname(self.path)):
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= COLUMNS_SYNC_BATCH:
+                    added += self.columns.append_many(batch, dict(position))
+                    batch = []
+            return added + self.columns.append_many(batch, dict(position))
+        finally:
+            if live is not None:
+                live.close()
+
+    def _should_rotate(self):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return False
+        if size == 0:
+            return False
+        if self.rotate_bytes and size >= self.rotate_bytes:
+            return True
+        if self.rotate_seconds:
+            with open(self.path, "rb") as f:
+                first = _line_timestamp(f.readline())
+            if first is not None:
+                # log timestamps are naive UTC (datetime.utcnow)
+                age = datetime.utcnow() - datetime.fromisoformat(first)
+                return age.total_seconds() >= self.rotate_seconds
+        return False
+
+    def _rotate(self):
+        # called with the file lock held: renames the live file to the next segment
+        manifest = read_manifest(self.path)
+        segments = manifest["segments"]
+        number = segments[-1]["number"] + 1 if segments else 1
+        first_line = segments[-1]["first_line"] + segments[-1]["lines"] if segments else 0
+        base, ext = os.path.splitext(self.path)
+        segment_path = f"{base}.{number:06d}{ext}"
+        os.replace(self.path, segment_path)
+
+        lines, first, last = 0, None, None
+        with open(segment_path, "rb") as f:
+            first = _line_timestamp(f.readline())
+            f.seek(0)
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                lines += chunk.count(b"\n")
+            last = _line_timestamp(_last_line(f, os.path.getsize(segment_path)))
+        segments.append({
+            "number": number,
+            "file": os.path.basename(segment_path) + ".gz",
+            "first_line": first_line,
+            "lines": lines,
+            "first_timestamp": first,
+            "last_timestamp": last,
+        })
+        # listed as .gz right away: readers fall back to the plain file until it is compressed
+        _write_manifest(self.path, manifest)
+        self.rotations += 1
+        return segment_path
+
+    @staticmethod
+    def _compress(segment_path):
+        tmp_path = segment_path + ".gz.tmp"
+        with open(segment_path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, segment_path + ".gz")
+        os.remove(segment_path)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "store_backlog": len(self._store_backlog),
+            "store_failures": self.store_failures,
+            "store_dropped": self.store_dropped,
+            "fsync": self.fsync,
+            "last_error": self.last_error,
+        }
+
+
+log_writer = LogWriter(store=log_store, columns=metric_columns)
+# scripts that log without a server lifespan still get their lines written
+atexit.register(log_writer.close)
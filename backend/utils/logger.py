@@ -1,34 +1,55 @@
 # logger.py
-import os
 import json
+import heapq
+import secrets
 from datetime import datetime
 from collections import defaultdict
 
-LOG_FILE = "logs/qa_log.jsonl"
+from utils.log_writer import LOG_FILE, log_writer, iter_log_lines
+from utils.metrics import timed
 
-def log_interaction(question, answer, metrics=None):
-    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+def new_message_id():
+    # 53 random bits: the most a JavaScript number in the frontend holds exactly
+    return secrets.randbits(53)
+
+@timed("log_write")
+def log_interaction(question, answer, metrics=None, model=None, reference=None):
+    """Logs one answered question; returns its message ID (the ID /feedback refers to).
+    reference is the reference file the answer was scored against.
+    The entry is buffered and written in the background by utils.log_writer."""
+    message_id = new_message_id()
     log_entry = {
         "timestamp": datetime.utcnow().isoformat(),
+        "message_id": message_id,
         "question": question,
         "answer": answer,
+        "model": model,
+        "reference": reference,
         "metrics": metrics or {},
     }
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(log_entry) + "\n")
-
-def load_logs():
-    entries = []
-    if not os.path.exists(LOG_FILE):
-        return entries
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            entries.append(json.loads(line))
-    return entries
-
-def rank_by_metric(entries, metric_name="ROUGE_L"):
-    filtered = [e for e in entries if e.get("metrics") and metric_name in e["metrics"]]
-    ranked = sorted(filtered, key=lambda e: e["metrics"][metric_name], reverse=True)
+    log_writer.write(log_entry)
+    return message_id
+
+def iter_logs(since=None, until=None):
+    # streams entries one line at a time, across rotated segments; since/until are ISO timestamps (until exclusive)
+    for line in iter_log_lines(LOG_FILE, since, until):
+        entry = json.loads(line)
+        if since and entry["timestamp"] < since:
+            continue
+        if until and entry["timestamp"] >= until:
+            continue
+        yield entry
+
+def load_logs(since=None, until=None):
+    return list(iter_logs(since, until))
+
+def rank_by_metric(entries, metric_name="ROUGE_L", limit=None):
+    filtered = (e for e in entries if e.get("metrics") and metric_name in e["metrics"])
+    key = lambda e: e["metrics"][metric_name]
+    if limit is not None:
+        # heap-based top-K: O(k) memory, so entries can be a stream such as iter_logs()
+        return heapq.nlargest(limit, filtered, key=key)
+    ranked = sorted(filtered, key=key, reverse=True)
     return ranked
 
 def surface_low_scores(entries, metric_name="ROUGE_L", threshold=0.5):
@@ -0,0 +1,308 @@
+# metric_columns.py
+"""Columnar copy of the interaction log's scores, for /analysis rank and bad.
+
+Each log entry is one row of fixed-width little-endian columns, one file each in
+logs/columns/: float32 per metric (NaN when missing), and int64 timestamp (UTC
+microseconds), question ID, message ID (-1 when missing) and offset into
+text.jsonl with an int32 length. text.jsonl holds the answer, model, reference
+and original timestamp of every row; questions.jsonl holds each distinct
+question once (its line number is the question ID). Queries memory-map the
+columns and filter and sort them with NumPy, so they never parse answer text,
+and read text.jsonl only for the rows they return.
+
+meta.json records the committed row count and file sizes, and the position in
+the log the columns are up to date with. It is replaced after the columns are
+appended, so readers never see a half-written row, and bytes past the committed
+sizes (an interrupted append) are truncated by the next one. utils.log_writer
+appends every batch it writes, under the log's file lock, and rebuilds the
+columns from the log if they are missing or behind. Rebuild them from scratch
+with:
+    python -m utils.metric_columns build
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from utils.log_store import METRICS, decode_cursor, encode_cursor, log_store
+
+COLUMNS_DIR = "logs/columns"
+ID_COLUMNS = {"timestamp": "<i8", "question_id": "<i8", "message_id": "<i8", "text_offset": "<i8",
+              "text_length": "<i4"}
+COLUMNS = {**ID_COLUMNS, **{m: "<f4" for m in METRICS}}
+# rows scanned at a time by below(), which stops once it has a page
+SCAN_ROWS = 1 << 20
+_EPOCH = datetime(1970, 1, 1)
+
+
+def timestamp_us(timestamp):
+    """ISO timestamp -> microseconds since the epoch; naive timestamps are UTC, like the log's."""
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid timestamp: {timestamp}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return (parsed - _EPOCH) // timedelta(microseconds=1)
+
+
+def _score(value):
+    # float32 keeps about 7 significant digits: 0.3529412, not 0.3529411852359772
+    return float(f"{value:.7g}")
+
+
+class MetricColumns:
+    def __init__(self, directory=COLUMNS_DIR, store=log_store):
+        self.directory = directory
+        # where /feedback votes are kept, joined onto the rows returned
+        self.store = store
+        self._lock = threading.Lock()
+        self._maps = None  # (rows, {column: memmap})
+        self._questions = []
+        self._question_ids = {}
+        self._questions_bytes = 0
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _column_path(self, name):
+        return self._path(f"{name}.{COLUMNS[name][1:]}")
+
+    def _read_meta(self):
+        try:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"rows": 0, "text_bytes": 0, "questions": 0, "questions_bytes": 0,
+                    "position": {"base_line": 0, "offset": 0, "line": 0}}
+
+    def _write_meta(self, meta):
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def position(self):
+        """Position in the log (see utils.log_writer.read_log_from) the columns are up to date with."""
+        return self._read_meta()["position"]
+
+    def _refresh_questions(self, meta):
+        # questions added by other workers since the last call; called with self._lock held
+        if len(self._questions) > meta["questions"]:
+            self._questions, self._question_ids, self._questions_bytes = [], {}, 0
+        missing = meta["questions"] - len(self._questions)
+        if not missing:
+            return
+        with open(self._path("questions.jsonl"), "rb") as f:
+            f.seek(self._questions_bytes)
+            for _ in range(missing):
+                line = f.readline()
+                question = json.loads(line)
+                self._question_ids[question] = len(self._questions)
+                self._questions.append(question)
+                self._questions_bytes += len(line)
+
+    def append_many(self, entries, position):
+        """
+        Appends log entries as rows, and records position as the point in the log they
+        reach. Single writer: utils.log_writer calls it with the log's file lock held.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        meta = self._read_meta()
+        # drop what an interrupted append left past the committed sizes
+        committed = {self._column_path(name): meta["rows"] * np.dtype(dtype).itemsize
+                     for name, dtype in COLUMNS.items()}
+        committed[self._path("text.jsonl")] = meta["text_bytes"]
+        committed[self._path("questions.jsonl")] = meta["questions_bytes"]
+        for path, size in committed.items():
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+        n = len(entries)
+        columns = {name: np.empty(n, dtype) for name, dtype in ID_COLUMNS.items()}
+        columns.update({m: np.full(n, np.nan, COLUMNS[m]) for m in METRICS})
+        texts, new_questions = [], []
+        text_offset = meta["text_bytes"]
+        with self._lock:
+            self._refresh_questions(meta)
+            for i, entry in enumerate(entries):
+                question = entry["question"]
+                question_id = self._question_ids.get(question)
+                if question_id is None:
+                    question_id = self._question_ids[question] = len(self._questions)
+                    self._questions.append(question)
+                    new_questions.append((json.dumps(question) + "\n").encode("utf-8"))
+                text = (json.dumps({
+                    "timestamp": entry["timestamp"],
+                    "answer": entry.get("answer"),
+                    "model": entry.get("model"),
+                    "reference": entry.get("reference"),
+                }) + "\n").encode("utf-8")
+                texts.append(text)
+                message_id = entry.get("message_id")
+                columns["timestamp"][i] = timestamp_us(entry["timestamp"])
+                columns["question_id"][i] = question_id
+                columns["message_id"][i] = -1 if message_id is None else message_id
+                columns["text_offset"][i] = text_offset
+                columns["text_length"][i] = len(text)
+                text_offset += len(text)
+                for m, value in (entry.get("metrics") or {}).items():
+                    if m in METRICS and value is not None:
+                        columns[m][i] = value
+            new_questions_bytes = sum(len(q) for q in new_questions)
+            self._questions_bytes += new_questions_bytes
+
+            for name, values in columns.items():
+                with open(self._column_path(name), "ab") as f:
+                    f.write(values.tobytes())
+            with open(self._path("text.jsonl"), "ab") as f:
+                f.write(b"".join(texts))
+            with open(self._path("questions.jsonl"), "ab") as f:
+                f.write(b"".join(new_questions))
+            self._write_meta({
+                "rows": meta["rows"] + n,
+                "text_bytes": text_offset,
+                "questions": len(self._questions),
+                "questions_bytes": meta["questions_bytes"] + new_questions_bytes,
+                "position": position,
+            })
+        return n
+
+    def reset(self):
+        """Deletes every column (before rebuilding them from the log)."""
+        with self._lock:
+            for name in [*(os.path.basename(self._column_path(c)) for c in COLUMNS), "text.jsonl", "questions.jsonl",
+                         "meta.json"]:
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            self._maps = None
+            self._questions, self._question_ids, self._questions_bytes = [], {}, 0
+
+    def _snapshot(self):
+        """(rows, {column: array}) of the committed rows, memory-mapped."""
+        meta = self._read_meta()
+        rows = meta["rows"]
+        with self._lock:
+            self._refresh_questions(meta)
+            if self._maps is None or self._maps[0] != rows:
+                if rows:
+                    # plain ndarray views: cheaper to slice than np.memmap objects
+                    maps = {name: np.asarray(np.memmap(self._column_path(name), dtype, mode="r", shape=(rows,)))
+                            for name, dtype in COLUMNS.items()}
+                else:
+                    maps = {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+                self._maps = (rows, maps)
+            return self._maps
+
+    @staticmethod
+    def _check_metric(metric_name):
+        if metric_name not in METRICS:
+            raise ValueError(f"Unknown metric: {metric_name}")
+
+    @staticmethod
+    def _filter_time(mask, timestamps, since, until):
+        if since:
+            mask &= timestamps >= timestamp_us(since)
+        if until:
+            mask &= timestamps < timestamp_us(until)
+        return mask
+
+    def _entries(self, rows, columns, metrics):
+        # same shape as LogStore._to_entry; text.jsonl is read for these rows only
+        if not len(rows):
+            return []
+        page = {name: columns[name][rows].tolist() for name in ("question_id", "message_id", "text_offset",
+                                                                  "text_length", *metrics)}
+        votes = self.store.votes([m for m in page["message_id"] if m >= 0]) if self.store is not None else {}
+        entries = []
+        with open(self._path("text.jsonl"), "rb") as f:
+            for i, message_id in enumerate(page["message_id"]):
+                f.seek(page["text_offset"][i])
+                text = json.loads(f.read(page["text_length"][i]))
+                entry = {
+                    "timestamp": text["timestamp"],
+                    "question": self._questions[page["question_id"][i]],
+                    "answer": text["answer"],
+                    # NaN (missing) is the only value not equal to itself
+                    "metrics": {m: _score(page[m][i]) for m in metrics if page[m][i] == page[m][i]},
+                }
+                for key, value in (("message_id", message_id if message_id >= 0 else None), ("model", text["model"]),
+                                   ("feedback", votes.get(message_id)), ("reference", text["reference"])):
+                    if value is not None:
+                        entry[key] = value
+                entries.append(entry)
+        return entries
+
+    def top(self, metric_name="ROUGE_L", limit=10, cursor=None, since=None, until=None, metrics=METRICS):
+        """Highest scores first, then log order. Returns (entries, next_cursor)."""
+        self._check_metric(metric_name)
+        for m in metrics:
+            self._check_metric(m)
+        rows, columns = self._snapshot()
+        scores = columns[metric_name]
+        # negated so that the best come first; rows filtered out are set to NaN, which sorts last
+        keys = -scores
+        if since or until:
+            keys[~self._filter_time(np.ones(rows, bool), columns["timestamp"], since, until)] = np.nan
+        if cursor:
+            score, last_row = decode_cursor(cursor)
+            key = -np.float32(score)
+            keys[keys < key] = np.nan
+            keys[np.flatnonzero(keys[:last_row + 1] == key)] = np.nan
+        kth = np.partition(keys, limit)[limit] if rows > limit + 1 else np.nan
+        # every row at least as good as the (limit + 1)th best, ties included, then those in order
+        candidates = np.flatnonzero(keys <= kth if kth == kth else keys == keys)
+        page = candidates[np.lexsort((candidates, keys[candidates]))[:limit + 1]]
+        next_cursor = encode_cursor([float(scores[page[limit - 1]]), int(page[limit - 1])]) \
+            if len(page) > limit else None
+        return self._entries(page[:limit], columns, metrics), next_cursor
+
+    def below(self, metric_name="ROUGE_L", threshold=0.5, limit=50, cursor=None, since=None, until=None,
+              metrics=METRICS):
+        """Entries scoring under threshold in log order. Returns (entries, next_cursor)."""
+        self._check_metric(metric_name)
+        for m in metrics:
+            self._check_metric(m)
+        rows, columns = self._snapshot()
+        start = decode_cursor(cursor)[0] + 1 if cursor else 0
+        page = []
+        while start < rows and len(page) <= limit:
+            end = min(rows, start + SCAN_ROWS)
+            mask = self._filter_time(columns[metric_name][start:end] < threshold, columns["timestamp"][start:end],
+                                     since, until)
+            page.extend((np.flatnonzero(mask)[:limit + 1 - len(page)] + start).tolist())
+            start = end
+        next_cursor = encode_cursor([page[limit - 1]]) if len(page) > limit else None
+        return self._entries(page[:limit], columns, metrics), next_cursor
+
+    def stats(self):
+        meta = self._read_meta()
+        return {"rows": meta["rows"], "questions": meta["questions"], "text_bytes": meta["text_bytes"],
+                "position": meta["position"]}
+
+
+metric_columns = MetricColumns()
+
+
+def main(argv=None):
+    from utils.log_writer import LOG_FILE, LogWriter
+
+    parser = argparse.ArgumentParser(description="Metric column store tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="rebuild the columns from the interaction log (and its rotated segments)")
+    build.add_argument("jsonl", nargs="?", default=LOG_FILE)
+    build.add_argument("--dir", default=COLUMNS_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        columns = MetricColumns(args.dir, store=None)
+        columns.reset()
+        added = LogWriter(args.jsonl, store=None, columns=columns).sync_columns()
+        print(f"Built {added} rows into {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
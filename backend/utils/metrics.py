@@ -0,0 +1,267 @@
+# metrics.py
+"""In-process request metrics: stage timers, histograms, counters and gauges,
+rendered in the Prometheus text format for GET /metrics.
+
+A stage is timed with timed("stage") as a context manager or decorator, or
+reported with record("stage", seconds) when it was timed elsewhere (e.g. in a
+scoring worker process). Each observation is two perf_counter() calls and a
+locked bucket increment, cheap enough to leave on in production. The stages
+are also summed per HTTP request (MetricsMiddleware opens a breakdown for each,
+collect_timings() does it elsewhere), for the "timing" returned in developer
+mode (METRICS_DEV_TIMING=1).
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# add a per-request stage breakdown (milliseconds) to /ask and /retry responses
+METRICS_DEV_TIMING = os.getenv("METRICS_DEV_TIMING", "0") == "1"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_breakdown = contextvars.ContextVar("stage_breakdown", default=None)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [count per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[n]) for n in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self, **labels):
+        """(count, sum) for one label set."""
+        key = tuple(str(labels[n]) for n in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            return (sum(series[0]), series[1]) if series else (0, 0.0)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                out.append((f"{self.name}_bucket", _format_labels(self.labels, key, [("le", le)]), cumulative))
+            out.append((f"{self.name}_sum", _format_labels(self.labels, key), total))
+            out.append((f"{self.name}_count", _format_labels(self.labels, key), cumulative))
+        return out
+
+
+class Gauge:
+    """Value read when /metrics is scraped, from a callable (e.g. a queue length)."""
+    kind = "gauge"
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labels = ()
+
+    def samples(self):
+        return [(self.name, "", self.read())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram, name, help, labels, buckets)
+
+    def gauge(self, name, help, read):
+        return self._add(Gauge, name, help, read)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                # a failing gauge must not break the whole scrape
+                lines.append(f"# {metric.name} unavailable: {e!r}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+stage_seconds = registry.histogram(
+    "llm_eval_stage_seconds", "Time spent in each stage of answering and scoring a question.", ["stage"])
+request_seconds = registry.histogram(
+    "llm_eval_request_seconds", "HTTP request time, until the response (or stream) is fully sent.",
+    ["method", "route"])
+requests_total = registry.counter(
+    "llm_eval_requests_total", "HTTP requests by route and status code.", ["method", "route", "status"])
+stage_errors_total = registry.counter(
+    "llm_eval_stage_errors_total", "Stages that ended with an exception.", ["stage"])
+
+
+def record(stage, seconds):
+    stage_seconds.observe(seconds, stage=stage)
+    timings = _breakdown.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class timed:
+    """
+    Times a stage into llm_eval_stage_seconds (and the current request's breakdown).
+    Use as `with timed("similarity_search"):` or as a decorator on a function or coroutine.
+    """
+
+    __slots__ = ("stage", "_start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.stage, time.perf_counter() - self._start)
+        if exc_type is not None:
+            stage_errors_total.inc(stage=self.stage)
+        return False
+
+    def __call__(self, fn):
+        stage = self.stage
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+@contextmanager
+def collect_timings(timings=None):
+    """
+    Sums the seconds of every stage timed inside the block, including in tasks and
+    threads (asyncio.to_thread) started from it, into the yielded dict.
+    Do not hold it open across a yield of an async generator.
+    """
+    timings = {} if timings is None else timings
+    token = _breakdown.set(timings)
+    try:
+        yield timings
+    finally:
+        _breakdown.reset(token)
+
+
+def request_timings():
+    """Stage seconds summed so far for the current request (empty outside one)."""
+    return _breakdown.get() or {}
+
+
+def timing_ms(timings):
+    return {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting HTTP requests per route template and status, and timing
+    them until the response is fully sent (for a stream, until it ends)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+        # shared with the handler and, for streams, the task sending the body
+        token = _breakdown.set({})
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _breakdown.reset(token)
+            # the route template (/jobs/{job_id}), not the raw path, to keep the label set small
+            route = getattr(scope.get("route"), "path", "unmatched")
+            request_seconds.observe(time.perf_counter() - start, method=scope["method"], route=route)
+            requests_total.inc(method=scope["method"], route=route, status=status)
@@ -1,13 +1,33 @@
 import asyncio
-from asyncio.subprocess import PIPE, create_subprocess_exec
+import json
+import os
 import subprocess
+import time
 
-async def call_ollama_model(prompt: str) -> str:
-    loop = asyncio.get_running_loop()
+from utils.metrics import record
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen2.5:0.5b")
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 2))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", 120))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", 5))
+OLLAMA_RETRIES = int(os.getenv("OLLAMA_RETRIES", 2))
+# fall back to `ollama run` when the HTTP API cannot be reached
+OLLAMA_CLI_FALLBACK = os.getenv("OLLAMA_CLI_FALLBACK", "1") == "1"
+
+
+class OllamaError(RuntimeError):
+    """A failed generation: error status, dropped connection or malformed response."""
+
+
+class OllamaUnreachable(OllamaError):
+    """Nothing is listening at the API URL; generate() and stream() then fall back to the CLI."""
 
-    def run_blocking_subprocess():
+
+def run_ollama_cli(prompt: str, model: str = OLLAMA_MODEL) -> str:
+    try:
         proc = subprocess.Popen(
-            ["ollama", "run", "qwen2.5:0.5b"],
+            ["ollama", "run", model],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -15,10 +35,196 @@ async def call_ollama_model(prompt: str) -> str:
             encoding="utf-8",
             errors="replace",
         )
-        stdout, stderr = proc.communicate(input=prompt)
-        if proc.returncode != 0:
-            raise RuntimeError(f"Ollama CLI failed: {stderr.strip()}")
-        return stdout.strip()
+    except FileNotFoundError as e:
+        raise OllamaError("Ollama API unreachable and the ollama CLI is not installed") from e
+    stdout, stderr = proc.communicate(input=prompt)
+    if proc.returncode != 0:
+        raise OllamaError(f"Ollama CLI failed: {stderr.strip()}")
+    return stdout.strip()
+
+
+class OllamaClient:
+    """Generates through the Ollama HTTP API (/api/generate) over pooled keep-alive
+    connections, with at most max_concurrency generations in flight. Timeouts,
+    dropped connections and 5xx responses are retried with backoff; if the server cannot be
+    reached at all the `ollama run` CLI is used instead (cli_fallback). Every failure,
+    malformed responses included, is raised as OllamaError (a RuntimeError)."""
+
+    def __init__(self, base_url=OLLAMA_URL, model=OLLAMA_MODEL, max_concurrency=OLLAMA_MAX_CONCURRENCY,
+                 timeout=OLLAMA_TIMEOUT, connect_timeout=OLLAMA_CONNECT_TIMEOUT, retries=OLLAMA_RETRIES,
+                 cli_fallback=OLLAMA_CLI_FALLBACK, transport=None):
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.cli_fallback = cli_fallback
+        self.transport = transport  # an httpx transport to use instead of the network (tests)
+        self._client = None
+        self._httpx = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.retried = 0
+        self.fallbacks = 0
+        self.total_seconds = 0.0
+
+    def client(self):
+        if self._client is None:
+            # imported on first use, so the server starts without loading httpx
+            import httpx
+            self._httpx = httpx
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                transport=self.transport,
+            )
+        return self._client
 
-    result = await loop.run_in_executor(None, run_blocking_subprocess)
-    return result
+    async def _post_generate(self, prompt, model):
+        client, httpx = self.client(), self._httpx
+        for attempt in range(self.retries + 1):
+            try:
+                response = await client.post(
+                    "/api/generate", json={"model": model, "prompt": prompt, "stream": False})
+                if response.status_code < 500:
+                    break
+                error = OllamaError(f"Ollama API failed: {response.status_code} {response.text.strip()}")
+            except httpx.ConnectError as e:
+                # nothing listening: retrying will not help, let the caller fall back
+                raise OllamaUnreachable(f"Ollama API unreachable at {self.base_url}: {e}") from e
+            except httpx.TransportError as e:
+                error = OllamaError(f"Ollama API failed: {e!r}")
+            if attempt < self.retries:
+                self.retried += 1
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        else:
+            raise error
+
+        if response.status_code != 200:
+            raise OllamaError(f"Ollama API failed: {response.status_code} {response.text.strip()}")
+        try:
+            return response.json()["response"].strip()
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise OllamaError(f"Malformed Ollama response: {e!r}") from e
+
+    async def generate(self, prompt: str, model: str | None = None) -> str:
+        model = model or self.model
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests += 1
+            start = time.perf_counter()
+            try:
+                try:
+                    return await self._post_generate(prompt, model)
+                except OllamaUnreachable:
+                    if not self.cli_fallback:
+                        raise
+                    self.fallbacks += 1
+                    return await asyncio.get_running_loop().run_in_executor(None, run_ollama_cli, prompt, model)
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.in_flight -= 1
+                self.total_seconds += elapsed
+                record("ollama_generate", elapsed)
+
+    async def stream(self, prompt: str, model: str | None = None):
+        """Yields the answer piece by piece as Ollama generates it. Failures before the
+        first piece are retried like generate(); the CLI fallback yields the whole answer."""
+        model = model or self.model
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests += 1
+            start = time.perf_counter()
+            try:
+                try:
+                    async for piece in self._stream_generate(prompt, model):
+                        yield piece
+                except OllamaUnreachable:
+                    if not self.cli_fallback:
+                        raise
+                    self.fallbacks += 1
+                    yield await asyncio.get_running_loop().run_in_executor(None, run_ollama_cli, prompt, model)
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.in_flight -= 1
+                self.total_seconds += elapsed
+                record("ollama_stream", elapsed)
+
+    async def _stream_generate(self, prompt, model):
+        client, httpx = self.client(), self._httpx
+        request = {"model": model, "prompt": prompt, "stream": True}
+        for attempt in range(self.retries + 1):
+            started = False
+            try:
+                async with client.stream("POST", "/api/generate", json=request) as response:
+                    if response.status_code >= 500:
+                        error = OllamaError(f"Ollama API failed: {response.status_code}")
+                    elif response.status_code != 200:
+                        await response.aread()
+                        raise OllamaError(f"Ollama API failed: {response.status_code} {response.text.strip()}")
+                    else:
+                        # newline-delimited JSON objects, the last one has "done": true
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            try:
+                                data = json.loads(line)
+                            except ValueError as e:
+                                raise OllamaError(f"Malformed Ollama response: {e!r}") from e
+                            if not isinstance(data, dict):
+                                raise OllamaError(f"Malformed Ollama response: {line[:200]!r}")
+                            if data.get("error"):
+                                raise OllamaError(f"Ollama API failed: {data['error']}")
+                            if data.get("response"):
+                                started = True
+                                yield data["response"]
+                            if data.get("done"):
+                                return
+                        return
+            except httpx.ConnectError as e:
+                raise OllamaUnreachable(f"Ollama API unreachable at {self.base_url}: {e}") from e
+            except httpx.TransportError as e:
+                if started:
+                    # part of the answer is already out, a retry would repeat it
+                    raise OllamaError(f"Ollama API failed mid-stream: {e!r}") from e
+                error = OllamaError(f"Ollama API failed: {e!r}")
+            if attempt < self.retries:
+                self.retried += 1
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        raise error
+
+    def stats(self):
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retried,
+            "cli_fallbacks": self.fallbacks,
+            "avg_ms": round(self.total_seconds / self.requests * 1000, 3) if self.requests else 0.0,
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+ollama_client = OllamaClient()
+
+
+async def call_ollama_model(prompt: str) -> str:
+    return await ollama_client.generate(prompt)
@@ -0,0 +1,24 @@
+# pdf_extract.py
+# PyPDF2-only helpers, kept apart from pdf_pipeline so extraction workers stay light to start
+import PyPDF2
+
+
+def extract_text_from_pdf(file_path: str) -> str:
+    try:
+        with open(file_path, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            return "".join(page.extract_text() or "" for page in reader.pages)
+    except Exception as e:
+        raise RuntimeError(f"Error reading PDF: {e}")
+
+
+def count_pages(file_path):
+    with open(file_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_page_range(file_path, start, stop):
+    # runs in a worker process
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
@@ -0,0 +1,159 @@
+# pdf_pipeline.py
+"""PDF -> chunks -> embeddings -> FAISS index, with the stages overlapped.
+
+Pages are extracted in parallel by a process pool (PyPDF2 is pure Python, so
+threads would serialize on the GIL), in ranges of PDF_PAGES_PER_TASK pages.
+Extracted text is fed to the chunker in page order as soon as each range is done,
+and chunks are embedded in batches while later pages are still being extracted.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 8))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 32))
+CHUNK_SIZE = 10000
+CHUNK_OVERLAP = 1000
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def get_text_chunks(text: str):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+    chunks = text_splitter.split_text(text)
+    return chunks
+
+
+class StreamingChunker:
+    """Splits text that arrives piece by piece into the same kind of chunks as
+    get_text_chunks. Text is buffered until it holds two chunks' worth; the last
+    chunk of each split is held back (as raw text) because it may still grow."""
+
+    def __init__(self, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.chunk_size = chunk_size
+        self._parts = []
+        self._length = 0
+
+    def feed(self, text):
+        self._parts.append(text)
+        self._length += len(text)
+        if self._length < 2 * self.chunk_size:
+            return []
+
+        buffered = "".join(self._parts)
+        chunks = self.splitter.split_text(buffered)
+        if not chunks:
+            return []
+        tail = buffered[buffered.rfind(chunks.pop()):]
+        self._parts = [tail]
+        self._length = len(tail)
+        return chunks
+
+    def flush(self):
+        buffered = "".join(self._parts)
+        self._parts = []
+        self._length = 0
+        return self.splitter.split_text(buffered) if buffered else []
+
+
+async def iter_page_texts(file_path, on_total=None, pages_per_task=PDF_PAGES_PER_TASK):
+    """Yields page texts in order while the remaining page ranges keep extracting."""
+    from utils.pdf_extract import count_pages, extract_page_range
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    total = await loop.run_in_executor(executor, count_pages, file_path)
+    if on_total:
+        on_total(total)
+    futures = [
+        loop.run_in_executor(executor, extract_page_range, file_path, start, min(start + pages_per_task, total))
+        for start in range(0, total, pages_per_task)
+    ]
+    try:
+        for future in futures:
+            for text in await future:
+                yield text
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+async def build_index(file_path, index_path, embeddings, progress=None, embed_batch_size=EMBED_BATCH_SIZE):
+    """
+    Extracts, chunks and embeds file_path concurrently, then saves a FAISS index to index_path.
+    :param progress: optional callable(**fields) called with stage, pages_total, pages_done, chunks_done
+    :returns: the FAISS store, or None when the PDF has no extractable text
+    """
+    report = progress or (lambda **fields: None)
+    queue = asyncio.Queue(maxsize=4 * embed_batch_size)
+    counts = {"pages_done": 0, "chunks_done": 0}
+
+    async def produce():
+        chunker = StreamingChunker()
+        report(stage="extracting")
+        async for page_text in iter_page_texts(file_path, lambda total: report(pages_total=total)):
+            counts["pages_done"] += 1
+            report(pages_done=counts["pages_done"])
+            for chunk in chunker.feed(page_text):
+                await queue.put(chunk)
+        for chunk in chunker.flush():
+            await queue.put(chunk)
+        await queue.put(None)
+
+    async def consume():
+        pairs, batch = [], []
+        while True:
+            chunk = await queue.get()
+            if chunk is not None:
+                batch.append(chunk)
+            if batch and (chunk is None or len(batch) >= embed_batch_size):
+                vectors = await asyncio.to_thread(embeddings.embed_documents, batch)
+                pairs.extend(zip(batch, vectors))
+                counts["chunks_done"] += len(batch)
+                report(chunks_done=counts["chunks_done"])
+                batch = []
+            if chunk is None:
+                return pairs
+
+    producer = asyncio.create_task(produce())
+    consumer = asyncio.create_task(consume())
+    try:
+        # fail fast if either stage fails, instead of leaving the other one blocked on the queue
+        done, _ = await asyncio.wait({producer, consumer}, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+        pairs = await consumer
+    finally:
+        producer.cancel()
+        consumer.cancel()
+    if not pairs:
+        return None
+
+    def save():
+        from langchain_community.vectorstores import FAISS
+        store = FAISS.from_embeddings(pairs, embeddings)
+        store.save_local(index_path)
+        return store
+
+    report(stage="indexing")
+    return await asyncio.to_thread(save)
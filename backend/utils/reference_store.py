@@ -0,0 +1,59 @@
+# reference_store.py
+import os
+import threading
+from collections import namedtuple
+
+from bleu.bleu_scorer import cook_refs
+
+Reference = namedtuple("Reference", ["path", "version", "text", "cooked"])
+
+
+def join_reference_lines(lines):
+    # same joining as utils.scorer.load_textfiles
+    return " ".join(line.strip() for line in lines)
+
+
+class ReferenceStore:
+    """Loads each reference file once and keeps its joined text and cooked BLEU
+    n-gram counts in memory. Entries are keyed by absolute path and reloaded when
+    the file's mtime or size changes."""
+
+    def __init__(self, n=4):
+        self.n = n
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        version = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.version == version:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry.version != version:
+                entry = self._load(path, version)
+                self._entries[path] = entry
+        return entry
+
+    def _load(self, path, version):
+        with open(path, "r", encoding="utf-8") as f:
+            text = join_reference_lines(f.readlines())
+        # references are long and cooked once, so use the packed integer n-gram counts
+        return Reference(path, version, text, cook_refs([text], n=self.n, packed=True))
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+reference_store = ReferenceStore()
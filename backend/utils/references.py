@@ -0,0 +1,117 @@
+# references.py
+# Keyword sets and the reference files answers to matching questions are scored against,
+# loaded from the reference catalog (REFERENCE_CATALOG) and compiled into one matcher per variant
+import json
+import os
+from collections import deque
+
+REFERENCE_CATALOG = os.getenv("REFERENCE_CATALOG", "reference/catalog.json")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over a list of keywords. find() reports every keyword
+    that occurs in the text as a substring (overlaps included) in one pass."""
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for keyword_id, keyword in enumerate(keywords):
+            state = 0
+            for ch in keyword:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            self.output[state] += (keyword_id,)
+
+        # breadth-first: fail links point to the longest proper suffix that is a trie node
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] += self.output[self.fail[child]]
+
+    def find(self, text):
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            if self.output[state]:
+                found.update(self.output[state])
+        return found
+
+
+class ReferenceMatcher:
+    """
+    Compiled form of an ordered list of (keywords, reference file) entries. An entry
+    matches when all its keywords occur in the lowercased question; the first matching
+    entry wins. Matching costs one automaton pass plus work proportional to the
+    keywords found, not to the number of entries.
+    """
+
+    def __init__(self, entries):
+        self.entries = [(frozenset(k.lower() for k in keywords), ref_file) for keywords, ref_file in entries]
+        keyword_ids = {}
+        self._entries_by_keyword = []  # keyword id -> indexes of the entries that need it
+        self._required = []
+        for index, (keywords, _) in enumerate(self.entries):
+            for keyword in keywords:
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(keyword_ids)
+                    self._entries_by_keyword.append([])
+                self._entries_by_keyword[keyword_ids[keyword]].append(index)
+            self._required.append(len(keywords))
+        self._automaton = KeywordAutomaton(list(keyword_ids))
+        # entries without keywords match every question
+        self._catch_all = next((i for i, n in enumerate(self._required) if n == 0), None)
+
+    def match(self, question):
+        best = self._catch_all
+        hits = {}
+        for keyword_id in self._automaton.find(question.lower()):
+            for index in self._entries_by_keyword[keyword_id]:
+                hits[index] = hits.get(index, 0) + 1
+                if hits[index] == self._required[index] and (best is None or index < best):
+                    best = index
+        return self.entries[best][1] if best is not None else None
+
+    def reference_files(self):
+        return list(dict.fromkeys(ref_file for _, ref_file in self.entries))
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def load_catalog(path=REFERENCE_CATALOG):
+    """
+    Reads the reference catalog: {"<variant>": [{"keywords": [...], "reference": "<file>"}, ...]}.
+    :returns: dict of variant -> ReferenceMatcher
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    return {
+        variant: ReferenceMatcher((entry["keywords"], entry["reference"]) for entry in entries)
+        for variant, entries in catalog.items()
+    }
+
+
+CATALOG = load_catalog()
+ASK_REFERENCES = CATALOG["ask"]
+RETRY_REFERENCES = CATALOG["retry"]
+
+
+def match_reference(question, keyword_triggers=ASK_REFERENCES):
+    if not isinstance(keyword_triggers, ReferenceMatcher):
+        # a plain list of (keywords, reference file) pairs
+        keyword_triggers = ReferenceMatcher(keyword_triggers)
+    return keyword_triggers.match(question)
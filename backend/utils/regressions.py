@@ -0,0 +1,141 @@
+# regressions.py
+"""Incremental regression detection over the interaction log.
+
+The detector keeps, per normalized question and metric, the last `window` scores
+and the latest regression, plus how far into the log it has read (the first line
+of the current file and a byte offset in it, so rotated segments are followed).
+Each update() only parses entries appended since the previous one, and the state
+is persisted so a restart picks up where it left off.
+
+An answer is a regression when its score is more than `threshold` below the mean
+of the previous `window` scores for the same question (window=1, threshold=0 is
+the plain "score went down" check of logger.detect_regressions). Entries without
+a value for a metric are skipped for that metric.
+"""
+import heapq
+import json
+import os
+import tempfile
+import threading
+
+from utils.log_store import METRICS, normalize_question
+from utils.log_writer import LOG_FILE, log_position_valid, log_snapshot, read_log_from
+
+REGRESSION_STATE = "logs/regression_state.json"
+REGRESSION_WINDOW = int(os.getenv("REGRESSION_WINDOW", 1))
+REGRESSION_THRESHOLD = float(os.getenv("REGRESSION_THRESHOLD", 0.0))
+
+
+class RegressionDetector:
+    def __init__(self, log_path=LOG_FILE, state_path=REGRESSION_STATE,
+                 window=REGRESSION_WINDOW, threshold=REGRESSION_THRESHOLD):
+        self.log_path = log_path
+        self.state_path = state_path
+        self.window = max(1, window)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.state = self._load_state()
+
+    def _empty_state(self):
+        return {"base_line": 0, "offset": 0, "line": 0, "window": self.window, "threshold": self.threshold,
+                "questions": {}}
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            # settings changed: rebuild from the start of the log
+            if state.get("window") == self.window and state.get("threshold") == self.threshold:
+                return state
+        return self._empty_state()
+
+    def _save_state(self):
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        # a temp file of our own: several workers may save at the same time, the last replace wins
+        f = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(self.state_path) or ".",
+                                        prefix=os.path.basename(self.state_path), suffix=".tmp", delete=False)
+        try:
+            with f:
+                json.dump(self.state, f)
+            os.replace(f.name, self.state_path)
+        except BaseException:
+            os.remove(f.name)
+            raise
+
+    def consume(self, entry):
+        q = normalize_question(entry["question"])
+        qstate = self.state["questions"].setdefault(q, {"history": {}, "regressions": {}})
+        metrics = entry.get("metrics") or {}
+
+        for m in METRICS:
+            if m not in metrics:
+                continue
+            curr = metrics[m]
+            history = qstate["history"].get(m)
+            if history:
+                baseline = sum(history) / len(history)
+                if baseline - curr > self.threshold:
+                    qstate["regressions"][m] = {
+                        "question": q,
+                        "previous_score": baseline,
+                        "current_score": curr,
+                        "timestamp_prev": qstate["timestamp"],
+                        "timestamp_curr": entry["timestamp"],
+                        "answer_prev": qstate["answer"],
+                        "answer_curr": entry.get("answer"),
+                    }
+            qstate["history"][m] = ((history or []) + [curr])[-self.window:]
+
+        qstate["timestamp"] = entry["timestamp"]
+        qstate["answer"] = entry.get("answer")
+
+    def update(self):
+        """Consumes entries appended to the log since the last call, following the log
+        across rotations. Returns how many."""
+        with self._lock:
+            segments, live = log_snapshot(self.log_path)
+            try:
+                consumed = self._consume_new(segments, live)
+            finally:
+                if live is not None:
+                    live.close()
+            if consumed:
+                self._save_state()
+            return consumed
+
+    def _consume_new(self, segments, live):
+        # state["base_line"] / ["offset"] / ["line"] is the read position of utils.log_writer
+        if not log_position_valid(segments, live, self.state):
+            # segments were removed or the log truncated or replaced: start over
+            self.state = self._empty_state()
+        consumed = 0
+        for line in read_log_from(segments, live, self.state, os.path.dirname(self.log_path)):
+            if line.strip():
+                self.consume(json.loads(line))
+                consumed += 1
+        return consumed
+
+    def regressions(self, metric_name="ROUGE_L", limit=None, cursor=None, since=None, until=None):
+        """Latest regression of each question for the metric, ordered by question.
+        With a limit, returns (page, next_cursor) where the cursor is the last question returned."""
+        if metric_name not in METRICS:
+            raise ValueError(f"Unknown metric: {metric_name}")
+        found = []
+        # update() adds questions and replaces the state while it reads the log
+        with self._lock:
+            for q, qstate in self.state["questions"].items():
+                reg = qstate["regressions"].get(metric_name)
+                if reg is None or (cursor is not None and q <= cursor):
+                    continue
+                if (since and reg["timestamp_curr"] < since) or (until and reg["timestamp_curr"] >= until):
+                    continue
+                found.append(reg)
+        if limit is None:
+            return found
+        page = heapq.nsmallest(limit + 1, found, key=lambda r: r["question"])
+        next_cursor = page[limit - 1]["question"] if len(page) > limit else None
+        return page[:limit], next_cursor
+
+
+regression_detector = RegressionDetector()
@@ -1,5 +1,6 @@
 from bleu.bleu import Bleu
 from rouge.rouge import Rouge
+from utils.metrics import timed
 
 def load_textfiles(references, hypothesis):
     combined_ref = " ".join(line.strip() for line in references)
@@ -11,7 +12,7 @@ def load_textfiles(references, hypothesis):
 
     return refs, hypo
 
-def score(ref, hypo):
+def score(ref, hypo, cooked_refs=None):
     scorers = [
         (Bleu(4), ["Bleu_1", "Bleu_2", "Bleu_3", "Bleu_4"]),
         (Rouge(), "ROUGE_L"),
@@ -19,11 +20,20 @@ def score(ref, hypo):
     final_scores = {}
 
     for scorer, method in scorers:
-        score_val, scores = scorer.compute_score(ref, hypo)
+        with timed("bleu" if isinstance(scorer, Bleu) else "rouge"):
+            if cooked_refs is not None and isinstance(scorer, Bleu):
+                score_val, scores = scorer.compute_score(ref, hypo, cooked_refs=cooked_refs)
+            else:
+                score_val, scores = scorer.compute_score(ref, hypo)
         if isinstance(score_val, list):
             for m, s in zip(method, score_val):
                 final_scores[m] = s
         else:
             final_scores[method] = score_val
 
-    return final_scores
\ No newline at end of file
+    return final_scores
+
+def score_reference(reference, answer):
+    # reference: utils.reference_store.Reference, BLEU reuses its cooked n-gram counts
+    _, hypo = load_textfiles([], [answer])
+    return score({0: [reference.text]}, hypo, cooked_refs={0: reference.cooked})
@@ -0,0 +1,132 @@
+# scoring_pool.py
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.metrics import record
+
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", os.cpu_count() or 1))
+SCORING_MAX_PENDING = int(os.getenv("SCORING_MAX_PENDING", SCORING_WORKERS * 4))
+
+
+class ScoringQueueFull(RuntimeError):
+    pass
+
+
+def _timed_call(fn, args):
+    # runs in the worker process
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _load_references():
+    # worker initializer: read and cook every catalog reference once, up front
+    from utils.reference_store import reference_store
+    from utils.references import CATALOG
+    for matcher in CATALOG.values():
+        for ref_file in matcher.reference_files():
+            try:
+                reference_store.get(ref_file)
+            except OSError as e:
+                print("Reference not loaded:", ref_file, e)
+
+
+def _score_reference_task(ref_file, answer):
+    # each worker keeps its own reference store, so cooked refs stay warm per process;
+    # the stage timings are returned because metrics recorded here stay in the worker
+    from utils.metrics import collect_timings, timed
+    from utils.reference_store import reference_store
+    from utils.scorer import score_reference
+    with collect_timings() as timings:
+        with timed("reference_load"):
+            reference = reference_store.get(ref_file)
+        scores = score_reference(reference, answer)
+    return scores, timings
+
+
+class ScoringPool:
+    """Runs BLEU/ROUGE scoring in worker processes so it never blocks the event loop.
+    At most max_pending tasks are queued or running; beyond that, submit() raises
+    ScoringQueueFull instead of queueing more."""
+
+    def __init__(self, workers=SCORING_WORKERS, max_pending=SCORING_MAX_PENDING):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._executor = None
+        self._slots = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: forking a process that already runs the event loop's threads is unsafe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_load_references)
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._executor
+
+    async def submit(self, fn, *args):
+        """
+        :returns: (result, timing) where timing has queue_ms, run_ms and total_ms
+        """
+        executor = self._get_executor()
+        if self._slots.locked():
+            self.rejected += 1
+            raise ScoringQueueFull(f"Scoring queue is full ({self.max_pending} pending tasks)")
+
+        async with self._slots:
+            self.pending += 1
+            submitted = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                result, run_s = await loop.run_in_executor(executor, _timed_call, fn, args)
+            finally:
+                self.pending -= 1
+
+        total_s = time.perf_counter() - submitted
+        queue_s = max(0.0, total_s - run_s)
+        self.completed += 1
+        self.queue_seconds += queue_s
+        self.run_seconds += run_s
+        return result, {
+            "queue_ms": round(queue_s * 1000, 3),
+            "run_ms": round(run_s * 1000, 3),
+            "total_ms": round(total_s * 1000, 3),
+        }
+
+    async def score_reference(self, ref_file, answer):
+        """
+        :returns: (scores, timing) where timing also has the worker's reference_load,
+            bleu and rouge stage times in ms
+        """
+        (scores, stages), timing = await self.submit(_score_reference_task, os.path.abspath(ref_file), answer)
+        record("scoring_queue", timing["queue_ms"] / 1000)
+        for stage, seconds in stages.items():
+            record(stage, seconds)
+            timing[f"{stage}_ms"] = round(seconds * 1000, 3)
+        return scores, timing
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_ms": round(self.queue_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            "avg_run_ms": round(self.run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+        }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+scoring_pool = ScoringPool()
@@ -0,0 +1,69 @@
+# streaming.py
+import json
+import time
+from collections import deque
+
+STREAM_STATS_WINDOW = 1000
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class StreamTimer:
+    """Times one streamed answer: time to first token and total generation time."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.ttft_ms = None
+        self.total_ms = None
+
+    def token(self):
+        if self.ttft_ms is None:
+            self.ttft_ms = round((time.perf_counter() - self.start) * 1000, 3)
+
+    def finish(self):
+        self.total_ms = round((time.perf_counter() - self.start) * 1000, 3)
+        return {"ttft_ms": self.ttft_ms, "total_ms": self.total_ms}
+
+
+class StreamStats:
+    """Time-to-first-token and total time of the last `window` streams, per endpoint."""
+
+    def __init__(self, window=STREAM_STATS_WINDOW):
+        self.window = window
+        self.samples = {}  # endpoint -> deque of (ttft_ms, total_ms)
+        self.errors = {}
+
+    def record(self, endpoint, timer):
+        if timer.ttft_ms is not None:
+            self.samples.setdefault(endpoint, deque(maxlen=self.window)).append((timer.ttft_ms, timer.total_ms))
+
+    def record_error(self, endpoint):
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def stats(self):
+        result = {}
+        for endpoint in set(self.samples) | set(self.errors):
+            samples = self.samples.get(endpoint, ())
+            ttft = [s[0] for s in samples]
+            total = [s[1] for s in samples]
+            result[endpoint] = {
+                "streams": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "ttft_ms_p50": percentile(ttft, 0.5),
+                "ttft_ms_p95": percentile(ttft, 0.95),
+                "total_ms_p50": percentile(total, 0.5),
+                "total_ms_p95": percentile(total, 0.95),
+            }
+        return result
+
+
+stream_stats = StreamStats()
@@ -0,0 +1,71 @@
+# timeseries.py
+"""Per-metric time series of the interaction log.
+
+For every hour and day, over all answers and per reference and per model, the
+log store keeps a fixed-bin histogram of each metric (table metric_bins):
+SERIES_BINS equal-width bins over [0, 1], each with its count and sum of scores.
+Rows are added to as answers are logged, so reading a series never rescans the
+log. Count and mean are exact. Quantiles are interpolated within a bin, so they
+are exact to one bin width (0.01), however many answers a bucket holds. Bins of
+different buckets add up, so any range of buckets merges exactly.
+"""
+SERIES_BINS = 100
+# bucket = ISO timestamp prefix of this length
+GRANULARITIES = {"hour": 13, "day": 10}
+SERIES_DIMENSIONS = ["all", "reference", "model"]
+QUANTILES = {"p10": 0.1, "p50": 0.5, "p90": 0.9}
+
+
+def bin_index(value, bins=SERIES_BINS):
+    # scores are in [0, 1]; anything outside lands in the first or last bin
+    return min(bins - 1, max(0, int(value * bins)))
+
+
+def bin_sql(column, bins=SERIES_BINS):
+    """bin_index() as an SQL expression, for rebuilding from stored rows."""
+    return f"MIN({bins - 1}, MAX(0, CAST({column} * {bins} AS INTEGER)))"
+
+
+def series_keys(timestamp, reference, model):
+    """(granularity, bucket, dimension, value) of every series an answer belongs to."""
+    values = {"all": "*", "reference": reference or "none", "model": model or "unknown"}
+    return [(granularity, timestamp[:length], dimension, values[dimension])
+            for granularity, length in GRANULARITIES.items() for dimension in SERIES_DIMENSIONS]
+
+
+def bucket_bounds(since, until, length):
+    """(first, end) buckets overlapping [since, until): bucket >= first and bucket < end."""
+    first = since[:length] if since else None
+    end = None
+    if until:
+        # until inside a bucket keeps that bucket; exactly at its start excludes it
+        end = until[:length] if not until[length:].strip("T:.0") else until
+    return first, end
+
+
+def quantile(counts, q, bins=SERIES_BINS):
+    """
+    :param counts: dict of bin index -> count
+    :returns: the q-quantile, interpolated linearly inside its bin
+    """
+    total = sum(counts.values())
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index in sorted(counts):
+        count = counts[index]
+        if seen + count >= rank:
+            return (index + (rank - seen) / count) / bins
+        seen += count
+    return 1.0
+
+
+def summarize(counts, total_sum, bins=SERIES_BINS):
+    """count, mean and QUANTILES of one histogram."""
+    count = sum(counts.values())
+    summary = {"count": count, "mean": total_sum / count if count else None}
+    for name, q in QUANTILES.items():
+        value = quantile(counts, q, bins)
+        summary[name] = round(value, 4) if value is not None else None
+    return summary
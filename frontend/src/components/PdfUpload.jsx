@@ -45,9 +45,9 @@ const PdfUpload = ({ pdfFile, isUploading, uploadProgress, isProcessing, onFileC
           {pdfFile && <p className="text-sm text-accent">Selected: {pdfFile.name}</p>}
           {(isUploading || isProcessing) && (
             <div className="w-full space-y-2">
-              <Progress value={isUploading ? uploadProgress : 100} className="w-full h-2" />
+              <Progress value={uploadProgress} className="w-full h-2" />
               <p className="text-sm text-center text-primary">
-                {isUploading ? `Uploading... ${uploadProgress}%` : 'Processing PDF...'}
+                {isUploading ? `Uploading... ${uploadProgress}%` : `Processing PDF... ${uploadProgress}%`}
               </p>
             </div>
           )}
@@ -23,6 +23,9 @@ const ChatPage = () => {
   const [analysisData, setAnalysisData] = useState(null);
   const [showAnalysisModal, setShowAnalysisModal] = useState(false);
   const [loadingAnalysis, setLoadingAnalysis] = useState(false);
+  const [sessionId, setSessionId] = useState(
+    () => localStorage.getItem("sessionId") || null
+  );
   const { toast } = useToast();
 
   useEffect(() => {
@@ -47,6 +50,12 @@ const ChatPage = () => {
     localStorage.setItem("developerMode", JSON.stringify(developerMode));
   }, [developerMode]);
 
+  useEffect(() => {
+    if (sessionId) {
+      localStorage.setItem("sessionId", sessionId);
+    }
+  }, [sessionId]);
+
   const handleFileChange = (event) => {
     const file = event.target.files[0];
     if (file && file.type === "application/pdf") {
@@ -97,6 +106,9 @@ const ChatPage = () => {
     try {
       const formData = new FormData();
       formData.append("file", pdfFile);
+      if (sessionId) {
+        formData.append("session_id", sessionId);
+      }
 
       const response = await fetch(`${backendUrl}/upload-pdf`, {
         method: "POST",
@@ -107,32 +119,49 @@ const ChatPage = () => {
         throw new Error(`Upload failed with status ${response.status}`);
       }
 
-      // Optionally parse response
       const result = await response.json();
+      if (result.session_id) {
+        setSessionId(result.session_id);
+      }
 
       setIsUploading(false);
       setIsProcessing(true);
 
-      setTimeout(() => {
-        setIsProcessing(false);
-        const newAiMessage = {
-          id: Date.now(),
-          sender: "AI",
-          text: `I've processed the document "${pdfFile.name}". How can I help you with it?`,
-          timestamp: new Date().toISOString(),
-          bleu1: 0.0,
-          bleu2: 0.0,
-          bleu3: 0.0,
-          bleu4: 0.0,
-          rogue: 0.0,
-          feedback: null,
-        };
-        setMessages((prev) => [...prev, newAiMessage]);
-        toast({
-          title: "Processing Complete",
-          description: `"${pdfFile.name}" is ready.`,
-        });
-      }, 2000);
+      // indexing runs as a background job on the server; poll it until it finishes
+      let job = result;
+      while (job.status !== "done" && job.status !== "failed") {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const jobResponse = await fetch(`${backendUrl}/jobs/${result.job_id}`);
+        if (!jobResponse.ok) {
+          throw new Error(`Job status failed with status ${jobResponse.status}`);
+        }
+        job = await jobResponse.json();
+        if (job.pages_total) {
+          setUploadProgress(Math.round((job.pages_done / job.pages_total) * 100));
+        }
+      }
+      if (job.status === "failed") {
+        throw new Error(job.error || "Processing failed");
+      }
+
+      setIsProcessing(false);
+      const newAiMessage = {
+        id: Date.now(),
+        sender: "AI",
+        text: `I've processed the document "${pdfFile.name}". How can I help you with it?`,
+        timestamp: new Date().toISOString(),
+        bleu1: 0.0,
+        bleu2: 0.0,
+        bleu3: 0.0,
+        bleu4: 0.0,
+        rogue: 0.0,
+        feedback: null,
+      };
+      setMessages((prev) => [...prev, newAiMessage]);
+      toast({
+        title: "Processing Complete",
+        description: `"${pdfFile.name}" is ready.`,
+      });
     } catch (error) {
       setIsUploading(false);
       setIsProcessing(false);
@@ -159,7 +188,7 @@ const ChatPage = () => {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ question: inputValue }),
+        body: JSON.stringify({ question: inputValue, session_id: sessionId }),
       });
 
       if (!response.ok) {
@@ -181,7 +210,8 @@ const ChatPage = () => {
       });
 
       const newAiMessage = {
-        id: Date.now() + 1,
+        // the server's message_id links feedback on this answer to its scores
+        id: data.message_id ?? Date.now() + 1,
         sender: "AI",
         question: inputValue,
         text: data.answer,
@@ -297,6 +327,7 @@ const ChatPage = () => {
             msg.id === message.id
               ? {
                   ...msg,
+                  id: data.message_id ?? msg.id,
                   text: data.improved_answer,
                   bleu1:
                     data.metrics?.Bleu_1 !== undefined